@@ -0,0 +1,337 @@
+"""
+Qt-free game rules for Dots and Boxes.
+
+GameRules holds the board state logic and the computer player's move choice so it
+can run without a QApplication: the GUI board mixes it into its QWidget, while
+BoardState is a plain object used for AI look-ahead, self-play and other tools.
+"""
+import random
+from strings_and_coins import evaluator_for, component_cache
+from tablebase import perfect_move
+
+GRID_SIZE = 4  # 4x4 dots = 3x3 boxes
+ZOBRIST_SEED = 0x5EEDD07  # Fixed so position keys are identical across runs and processes
+
+_zobrist_tables = {}
+
+def zobrist_table(grid_size):
+    """
+    Return the Zobrist key table for a grid size, building it on first use.
+    :param grid_size: Number of dots per side
+    :return: Dict with 64-bit keys for every h/v line, the side to move and each score difference
+    """
+    table = _zobrist_tables.get(grid_size)
+    if table is None:
+        rng = random.Random(ZOBRIST_SEED + grid_size)
+        max_boxes = (grid_size - 1) ** 2
+        table = {
+            "h": [[rng.getrandbits(64) for _ in range(grid_size - 1)] for _ in range(grid_size)],
+            "v": [[rng.getrandbits(64) for _ in range(grid_size)] for _ in range(grid_size - 1)],
+            "side": [rng.getrandbits(64), rng.getrandbits(64)],
+            "score_diff": [rng.getrandbits(64) for _ in range(2 * max_boxes + 1)],
+            "diff_offset": max_boxes,
+        }
+        _zobrist_tables[grid_size] = table
+    return table
+
+
+# Stages of the computer player, by name -> GameRules method taking the available moves (and an
+# optional difficulty.AnytimeSearch budget) and returning a move or None. A strategy is a sequence
+# of stage names tried in order.
+STRATEGY_STAGES = {
+    "perfect": "_find_perfect_move",
+    "capture": "_find_box_completing_move",
+    "nimstring": "_find_nimstring_move",
+    "safe": "_find_safe_move",
+    "least_damaging": "_find_least_damaging_move",  # Learned evaluator if trained, else chain rollouts
+    "min_chain": "_find_min_chain_move",  # Always chain rollouts
+    "random": "_find_random_move",
+}
+DEFAULT_STRATEGY = ("perfect", "capture", "nimstring", "safe", "least_damaging")
+
+
+def preload_ai_tables():
+    """
+    Load the AI's lazily-initialized tables (nimber cache, learned evaluator weights).
+    Safe to run on a background thread; the first computer move then starts warm.
+    """
+    component_cache()
+    from evaluation import default_evaluator
+    evaluator = default_evaluator()
+    if evaluator is not None:
+        evaluator.weights
+
+
+class GameRules:
+    # No __init__ here: QWidget subclasses call _init_rules() themselves
+
+    def _init_rules(self, grid_size):
+        self.grid_size = grid_size
+        self.h_lines = [[False] * (self.grid_size - 1) for _ in range(self.grid_size)]
+        self.v_lines = [[False] * self.grid_size for _ in range(self.grid_size - 1)]
+        self.boxes = [[None] * (self.grid_size - 1) for _ in range(self.grid_size - 1)]
+        self.current_player = 0  # 0 = Human, 1 = Computer
+        self.scores = [0, 0]
+        self.zobrist = zobrist_table(self.grid_size)
+        self.lines_key = 0  # XOR of the Zobrist keys of every drawn line
+        self.game_over = False
+
+    def check_and_update_boxes(self):
+        made_box = False
+        for r in range(self.grid_size - 1):
+            for c in range(self.grid_size - 1):
+                if self.boxes[r][c] is not None:
+                    continue
+                if (
+                    self.h_lines[r][c] and
+                    self.h_lines[r + 1][c] and
+                    self.v_lines[r][c] and
+                    self.v_lines[r][c + 1]
+                ):
+                    self.boxes[r][c] = self.current_player
+                    self.scores[self.current_player] += 1
+                    made_box = True
+        if self.is_game_over():
+            self.game_over = True
+            self.update_status()
+        return made_box
+
+    @property
+    def position_key(self):
+        # 64-bit Zobrist key: drawn lines (kept incrementally by make_move), side to move and score difference
+        table = self.zobrist
+        return (
+            self.lines_key
+            ^ table["side"][self.current_player]
+            ^ table["score_diff"][self.scores[0] - self.scores[1] + table["diff_offset"]]
+        )
+
+    def is_game_over(self):
+        for row in self.h_lines:
+            if False in row:
+                return False
+        for row in self.v_lines:
+            if False in row:
+                return False
+        return True
+
+    def update_status(self):
+        pass
+
+    def choose_computer_move(self, strategy=DEFAULT_STRATEGY, search=None):
+        """
+        Run the strategy's stages in order and play the first move one of them finds.
+        :param strategy: Sequence of STRATEGY_STAGES names (DEFAULT_STRATEGY is the full AI)
+        :param search: difficulty.AnytimeSearch holding the search limits of a difficulty level
+            (None = the fixed ENDGAME_EDGES / MAX_COMPONENT_STRINGS limits and no time limit)
+        """
+        moves = self.available_moves()
+        for stage in strategy:
+            move = getattr(self, STRATEGY_STAGES[stage])(moves, search)
+            if move is not None:
+                return move
+        return random.choice(moves)
+
+    def _find_perfect_move(self, moves, search=None):
+        # Perfect play from a generated tablebase, or exact search over the last few lines
+        if search is None:
+            return perfect_move(self)
+        edges = search.endgame_edges(len(moves))
+        if edges is None:
+            return None
+        return perfect_move(self, edges, search.endgame_solver(self.grid_size))
+
+    def _find_nimstring_move(self, moves, search=None):
+        # Exact strings-and-coins play once the position splits into small enough components
+        if search is None:
+            return evaluator_for(self.grid_size).winning_move(self)
+        max_strings = search.component_strings()
+        if max_strings is None:
+            return None
+        return search.nimstring_evaluator(self.grid_size).winning_move(self, max_strings)
+
+    def _find_random_move(self, moves, search=None):
+        return random.choice(moves)
+
+    def _find_box_completing_move(self, moves, search=None):
+        for move in moves:
+            test = self.copy_state()
+            test.make_move(*move, player=1)
+            if test.check_and_update_boxes_for_move(*move, player=1):
+                return move
+        return None
+
+    def _find_safe_move(self, moves, search=None):
+        safe_moves = [move for move in moves if not self.move_makes_third_side(move)]
+        return random.choice(safe_moves) if safe_moves else None
+
+    def _find_least_damaging_move(self, moves, search=None):
+        if search is None or search.use_evaluator:
+            from evaluation import default_evaluator  # Imported here so NumPy stays off the startup path
+            evaluator = default_evaluator()
+            if evaluator is not None:
+                # One batched forward pass over every child instead of a chain rollout per move
+                if search is not None:
+                    search.tick(len(moves), check_time=True)
+                return evaluator.best_move(self, moves)
+        return self._find_min_chain_move(moves, search)
+
+    def _find_min_chain_move(self, moves, search=None):
+        # For each move, simulate and count the full chain of boxes the opponent could claim
+        min_chain = None
+        best_moves = []
+        if search is not None:
+            moves = random.sample(moves, len(moves))  # A budget cut short still leaves an unbiased sample
+        for move in moves:
+            chain = self.chain_after(move) if search is None else search.chain_after(self, move)
+            if min_chain is None or chain < min_chain:
+                min_chain = chain
+                best_moves = [move]
+                if search is not None:
+                    search.offer(move)
+            elif chain == min_chain:
+                best_moves.append(move)
+        return random.choice(best_moves) if best_moves else random.choice(moves)
+
+    def chain_after(self, move):
+        # Boxes the opponent can take in a row after the computer plays `move`
+        test = self.copy_state()
+        test.make_move(*move, player=1)
+        return test._simulate_opponent_chain()
+
+    def _simulate_opponent_chain(self):
+        # Simulate the opponent's turn, recursively claiming all possible boxes in a chain
+        total = 0
+        while True:
+            moves = self.available_moves()
+            best = None
+            best_count = 0
+            for move in moves:
+                count = self._count_new_boxes(*move, player=0)
+                if count > best_count:
+                    best_count = count
+                    best = move
+            if best and best_count > 0:
+                self.make_move(*best, player=0)
+                self.check_and_update_boxes_for_move(*best, player=0)
+                total += best_count
+            else:
+                break
+        return total
+
+    def _count_new_boxes(self, r, c, is_h, player):
+        # Count how many boxes are completed by this (not yet drawn) move: those with the other three sides drawn
+        count = 0
+        for rr, cc in self._adjacent_boxes(r, c, is_h):
+            if (
+                self.h_lines[rr][cc] +
+                self.h_lines[rr + 1][cc] +
+                self.v_lines[rr][cc] +
+                self.v_lines[rr][cc + 1] == 3 and
+                self.boxes[rr][cc] is None
+            ):
+                count += 1
+        return count
+
+    def _adjacent_boxes(self, r, c, is_h):
+        adjacent = []
+        if is_h:
+            if r > 0:
+                adjacent.append((r - 1, c))
+            if r < self.grid_size - 1:
+                adjacent.append((r, c))
+        else:
+            if c > 0:
+                adjacent.append((r, c - 1))
+            if c < self.grid_size - 1:
+                adjacent.append((r, c))
+        return adjacent
+
+    def available_moves(self):
+        moves = []
+        for r in range(self.grid_size):
+            for c in range(self.grid_size - 1):
+                if not self.h_lines[r][c]:
+                    moves.append((r, c, True))
+        for r in range(self.grid_size - 1):
+            for c in range(self.grid_size):
+                if not self.v_lines[r][c]:
+                    moves.append((r, c, False))
+        return moves
+
+    def move_makes_third_side(self, move):
+        r, c, is_h = move
+        if is_h:
+            # Top box
+            if r > 0 and self._box_has_two_sides(self.h_lines, self.v_lines, r - 1, c):
+                return True
+            # Bottom box
+            if r < self.grid_size - 1 and self._box_has_two_sides(self.h_lines, self.v_lines, r, c):
+                return True
+        else:
+            # Left box
+            if c > 0 and self._box_has_two_sides(self.h_lines, self.v_lines, r, c - 1):
+                return True
+            # Right box
+            if c < self.grid_size - 1 and self._box_has_two_sides(self.h_lines, self.v_lines, r, c):
+                return True
+        return False
+
+    def _box_has_two_sides(self, h_lines, v_lines, r, c):
+        n = 0
+        if h_lines[r][c]: n += 1
+        if h_lines[r + 1][c]: n += 1
+        if v_lines[r][c]: n += 1
+        if v_lines[r][c + 1]: n += 1
+        return n == 2
+
+    def copy_state(self):
+        new = BoardState(self.grid_size)
+        new.h_lines = [row[:] for row in self.h_lines]
+        new.v_lines = [row[:] for row in self.v_lines]
+        new.boxes = [row[:] for row in self.boxes]
+        new.current_player = self.current_player
+        new.scores = self.scores[:]
+        new.lines_key = self.lines_key
+        new.game_over = self.game_over
+        return new
+
+    def make_move(self, r, c, is_h, player=None):
+        if is_h:
+            if not self.h_lines[r][c]:
+                self.h_lines[r][c] = True
+                self.lines_key ^= self.zobrist["h"][r][c]
+        else:
+            if not self.v_lines[r][c]:
+                self.v_lines[r][c] = True
+                self.lines_key ^= self.zobrist["v"][r][c]
+
+    def check_and_update_boxes_for_move(self, r, c, is_h, player):
+        made_box = False
+        # This only checks boxes *adjacent to this move*
+        adjacent = []
+        if is_h:
+            if r > 0:
+                adjacent.append((r - 1, c))
+            if r < self.grid_size - 1:
+                adjacent.append((r, c))
+        else:
+            if c > 0:
+                adjacent.append((r, c - 1))
+            if c < self.grid_size - 1:
+                adjacent.append((r, c))
+        for rr, cc in adjacent:
+            if (
+                self.h_lines[rr][cc] and
+                self.h_lines[rr + 1][cc] and
+                self.v_lines[rr][cc] and
+                self.v_lines[rr][cc + 1] and
+                self.boxes[rr][cc] is None
+            ):
+                made_box = True
+        return made_box
+
+
+class BoardState(GameRules):
+    def __init__(self, grid_size=GRID_SIZE):
+        self._init_rules(grid_size)
@@ -0,0 +1,219 @@
+"""
+Difficulty levels as compute budgets.
+
+Each level is a Budget: search nodes and a time limit per move, how far the
+exact searches may grow (free lines for the endgame solver, strings for a
+strings-and-coins component) and a noise rate (chance of a random move).
+
+AnytimeSearch runs the computer player's own stages
+(GameRules.choose_computer_move) under that budget with iterative deepening:
+the first pass uses small search limits, and while the budget lasts every
+completed pass raises them and runs again, its move replacing the last one.
+When the node or time budget runs out the move of the last completed pass is
+played, so a bigger budget buys deeper exact play. Exact searches share the
+process-wide solver memo and nimber cache, so an unfinished pass still speeds
+up the next move. A search's progress (best move and the limits it reached)
+can be handed to a later search of the same position, which continues from
+there: pondering uses this for the positions it searched ahead.
+"""
+import time
+import random
+
+from board_state import DEFAULT_STRATEGY
+from strings_and_coins import NimstringEvaluator, evaluator_for
+from tablebase import EndgameSolver, endgame_solver
+
+TIME_CHECK_INTERVAL = 16  # Nodes between clock reads
+EVALUATOR_MIN_MS = 500  # Loading NumPy and the learned weights takes ~100 ms the first time
+START_EDGES = 8  # Search limits of the first pass
+START_STRINGS = 6
+DEEPEN_STEP = 2  # Added to both limits after every completed pass
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class Budget:
+    def __init__(self, name, nodes, ms, edges, strings, noise=0.0, ponder=False):
+        """
+        :param nodes: Search nodes (solver positions, nimber components, chain rollouts) per move
+        :param ms: Hard time limit per move in milliseconds
+        :param edges: Most free lines the exact endgame search may deepen to (0 = no exact search)
+        :param strings: Largest strings-and-coins component it may deepen to (0 = no Nimstring play)
+        :param noise: Probability of playing a random move instead of searching
+        :param ponder: Whether to think during the human's turn
+        """
+        self.name = name
+        self.nodes = nodes
+        self.ms = ms
+        self.edges = edges
+        self.strings = strings
+        self.noise = noise
+        self.ponder = ponder
+
+
+LEVELS = {budget.name: budget for budget in (
+    Budget("Easy", nodes=200, ms=10, edges=0, strings=0, noise=0.3),
+    Budget("Medium", nodes=5_000, ms=100, edges=10, strings=8, noise=0.08),
+    Budget("Hard", nodes=60_000, ms=500, edges=16, strings=14, ponder=True),
+    Budget("Expert", nodes=300_000, ms=2_000, edges=20, strings=20, ponder=True),
+)}
+DEFAULT_LEVEL = "Hard"  # No random moves, like the original computer player, and at most 0.5 s per move
+
+
+class _BudgetedSolver(EndgameSolver):
+    # Shares the process-wide memo; every position searched for the first time costs a node
+    def __init__(self, shared, search):
+        self.__dict__.update(shared.__dict__)
+        self.search = search
+
+    def value(self, mask):
+        if mask not in self.memo:
+            self.search.tick()
+        return super().value(mask)
+
+
+class _BudgetedNimstring(NimstringEvaluator):
+    def __init__(self, shared, search):
+        self.__dict__.update(shared.__dict__)
+        self.search = search
+
+    def components(self, state):
+        components = super().components(state)
+        self.search.note_component(max((len(component) for component in components), default=0))
+        return components
+
+    def component_value(self, component):
+        self.search.tick(check_time=True)  # Each uncached component may expand into many others
+        return super().component_value(component)
+
+
+class AnytimeSearch:
+    def __init__(self, state, budget, strategy=DEFAULT_STRATEGY, stop=None, resume=None):
+        """
+        One move decision under a budget.
+        :param state: Position with the computer to move (not modified)
+        :param budget: Budget
+        :param strategy: Stages to run (see board_state.STRATEGY_STAGES)
+        :param stop: threading.Event that ends the search early, like a spent budget (e.g. pondering)
+        :param resume: progress() of an earlier search of this position: its move and limits are the start
+        """
+        self.state = state
+        self.budget = budget
+        self.strategy = strategy
+        self.stop = stop
+        self.nodes = 0
+        self.deadline = time.perf_counter() + budget.ms / 1000
+        self.use_evaluator = budget.ms >= EVALUATOR_MIN_MS
+        self.edges = min(START_EDGES, budget.edges)
+        self.strings = min(START_STRINGS, budget.strings)
+        self.deeper = False  # Set when a stage was held back by a limit this budget may still raise
+        self.passes = 0  # Completed passes
+        self.best = None  # Move of the last completed pass (before the first: best partial result)
+        self.done = False  # A pass ran that no limit held back: deeper passes would not change the move
+        self._chains = {}  # move -> opponent chain after it, kept across passes
+        self._slowest_rollout = 0.0
+        if resume is not None:
+            self.best, edges, strings, self.passes, self.done = resume
+            self.edges = min(edges, budget.edges)
+            self.strings = min(strings, budget.strings)
+
+    def tick(self, nodes=1, check_time=False):
+        """
+        Count search nodes; raise BudgetExceeded once the node or time budget is spent.
+        :param check_time: Read the clock now (costly nodes) instead of every TIME_CHECK_INTERVAL nodes
+        """
+        previous = self.nodes
+        self.nodes += nodes
+        if self.nodes > self.budget.nodes:
+            raise BudgetExceeded
+        if check_time or self.nodes // TIME_CHECK_INTERVAL != previous // TIME_CHECK_INTERVAL:
+            if time.perf_counter() > self.deadline or self.stop is not None and self.stop.is_set():
+                raise BudgetExceeded
+
+    def run(self):
+        """
+        :return: The best move found within the budget
+        """
+        if self.done:
+            return self.best
+        if self.best is None:
+            self.best = random.choice(self.state.available_moves())
+            if self.budget.noise and random.random() < self.budget.noise:
+                return self.best
+        try:
+            while True:
+                self.deeper = False
+                self.best = self.state.choose_computer_move(self.strategy, self)
+                self.passes += 1
+                if not self.deeper:
+                    self.done = True  # No stage was limited: a deeper pass would play the same way
+                    break
+                self.edges = min(self.edges + DEEPEN_STEP, self.budget.edges)
+                self.strings = min(self.strings + DEEPEN_STEP, self.budget.strings)
+        except BudgetExceeded:
+            pass
+        return self.best
+
+    def progress(self):
+        """
+        Where the search stopped, to pass as `resume` to a later search of the same position.
+        :return: (best move, limits of the next pass (edges, strings), completed passes, done)
+        """
+        return self.best, self.edges, self.strings, self.passes, self.done
+
+    # --- Limits and engines for the GameRules stages ---
+
+    def endgame_edges(self, free_lines):
+        """
+        :return: Free lines this pass may search exactly, or None if the level has no exact search
+        """
+        if not self.budget.edges:
+            return None
+        if self.edges < free_lines <= self.budget.edges:
+            self.deeper = True
+        return self.edges
+
+    def component_strings(self):
+        """
+        :return: Largest component this pass may solve, or None if the level has no Nimstring play
+        """
+        return self.strings if self.budget.strings else None
+
+    def note_component(self, strings):
+        if self.strings < strings <= self.budget.strings:
+            self.deeper = True
+
+    def endgame_solver(self, grid_size):
+        return _BudgetedSolver(endgame_solver(grid_size), self)
+
+    def nimstring_evaluator(self, grid_size):
+        return _BudgetedNimstring(evaluator_for(grid_size), self)
+
+    def chain_after(self, state, move):
+        # A rollout on a big board takes milliseconds: stop when the slowest one so far would not fit
+        chain = self._chains.get(move)
+        if chain is None:
+            started = time.perf_counter()
+            if started + self._slowest_rollout > self.deadline or self.stop is not None and self.stop.is_set():
+                raise BudgetExceeded
+            chain = self._chains[move] = state.chain_after(move)
+            self._slowest_rollout = max(self._slowest_rollout, time.perf_counter() - started)
+            self.tick()
+        return chain
+
+    def offer(self, move):
+        # Best move of an unfinished stage; only kept until the first pass completes
+        if not self.passes:
+            self.best = move
+
+
+def choose_move(state, budget, strategy=DEFAULT_STRATEGY, stop=None, resume=None):
+    """
+    Computer move for `state` at a difficulty level.
+    :param budget: Budget (e.g. LEVELS["Hard"])
+    :param stop: Optional threading.Event; once set, the best move so far is returned
+    :param resume: Optional AnytimeSearch.progress() of an earlier search of this position
+    """
+    return AnytimeSearch(state, budget, strategy, stop, resume).run()
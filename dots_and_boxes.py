@@ -1,32 +1,46 @@
+import time
+
+STARTUP_TIME = time.perf_counter()  # Before the PySide6 imports, for --benchmark-startup
+
 import sys
 import random
 import os
 import json
+import sqlite3
+import threading
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QMenuBar, QMenu, 
     QInputDialog, QHBoxLayout, QSizePolicy, QTableWidget, QTableWidgetItem, 
-    QPushButton, QDialog, QDialogButtonBox, QCheckBox, QRadioButton, QButtonGroup, QMessageBox
+    QPushButton, QDialog, QDialogButtonBox, QCheckBox, QRadioButton, QButtonGroup, QMessageBox,
+    QComboBox, QSlider
 )
-from PySide6.QtGui import QPainter, QPen, QColor, QAction, QPalette
-from PySide6.QtCore import Qt, QRectF, QSize, QTimer
-
-GRID_SIZE = 4  # 4x4 dots = 3x3 boxes
-DOT_RADIUS = 6
-LINE_THICKNESS = 3
-BOX_SIZE = 70
-PADDING = 40
+from PySide6.QtGui import QPainter, QPen, QColor, QAction, QActionGroup, QPalette, QPixmap
+from PySide6.QtCore import Qt, QSize, QTimer, Signal
+from strings_and_coins import save_cache as save_nimber_cache
+from board_state import GameRules, GRID_SIZE, preload_ai_tables
+from difficulty import LEVELS, DEFAULT_LEVEL, choose_move
+from ponder import Ponderer
+from heatmap import MoveHeatmap, TAKES, SAFE, GIVES
+from history import HistoryStore
+from render import BoardPainter, box_labels, DOT_RADIUS, LINE_THICKNESS, BOX_SIZE, PADDING
+from replay import load_replay
+
+IMPORT_DONE_TIME = time.perf_counter()
+
 DEFAULT_PLAYER_NAME = "Player 1"
+HEATMAP_COLORS = {
+    TAKES: QColor(60, 200, 90, 130),
+    SAFE: QColor(120, 170, 255, 90),
+    GIVES: QColor(230, 60, 60, 130),
+}
+
+class DotsAndBoxesBoard(QWidget, GameRules):
+    heatmap_scored = Signal(int, object)  # Emitted by the heatmap thread, delivered on the GUI thread
 
-class DotsAndBoxesBoard(QWidget):
     def __init__(self, grid_size=GRID_SIZE, player1_name=DEFAULT_PLAYER_NAME, parent=None):
         super().__init__(parent)
-        self.grid_size = grid_size
+        self._init_rules(grid_size)
         self.player1_name = player1_name
-        self.h_lines = [[False] * (self.grid_size - 1) for _ in range(self.grid_size)]
-        self.v_lines = [[False] * self.grid_size for _ in range(self.grid_size - 1)]
-        self.boxes = [[None] * (self.grid_size - 1) for _ in range(self.grid_size - 1)]
-        self.current_player = 0  # 0 = Human, 1 = Computer
-        self.scores = [0, 0]
         self.setFixedSize(
             QSize(
                 BOX_SIZE * (self.grid_size - 1) + PADDING * 2,
@@ -34,7 +48,6 @@ class DotsAndBoxesBoard(QWidget):
             )
         )
         self.status_callback = None
-        self.game_over = False
         self.last_move = None  # (r, c, is_h)
         self.blinking = False
         self.blink_state = False
@@ -44,12 +57,23 @@ class DotsAndBoxesBoard(QWidget):
         self.blink_target = None
         self.setMouseTracking(True)
         self.hovered_line = None  # (r, c, is_h) or None
+        self.painter = BoardPainter()  # Pens built once, shared with headless rendering
+        self.ponderer = Ponderer()
+        self.budget = LEVELS[DEFAULT_LEVEL]  # Compute budget of the computer player
+        self.heatmap = MoveHeatmap()
+        self.heatmap_enabled = False
+        self.heatmap_scored.connect(self._heatmap_scored)
+        self.heatmap_layer = None  # QPixmap of the evaluated lines, rebuilt only when results change
+        self.move_log = []  # (r, c, is_h, player) in play order, for the game history
+        self.game_over_callback = None
 
     def paintEvent(self, event):
         # NOTE: This method name must remain 'paintEvent' to override the Qt event handler.
         # Renaming to 'paint_event' (PEP8) would break PySide6/Qt event dispatch.
         qp = QPainter(self)
         qp.setRenderHint(QPainter.Antialiasing)
+        if self.heatmap_enabled and self.heatmap_layer is not None:
+            qp.drawPixmap(0, 0, self.heatmap_layer)
         self._draw_dots(qp)
         self._draw_horizontal_lines(qp)
         self._draw_vertical_lines(qp)
@@ -57,45 +81,13 @@ class DotsAndBoxesBoard(QWidget):
         self._draw_claimed_boxes(qp)
 
     def _draw_dots(self, qp):
-        for r in range(self.grid_size):
-            for c in range(self.grid_size):
-                qp.setBrush(Qt.black)
-                x = PADDING + c * BOX_SIZE
-                y = PADDING + r * BOX_SIZE
-                qp.drawEllipse(QRectF(x - DOT_RADIUS, y - DOT_RADIUS, 2 * DOT_RADIUS, 2 * DOT_RADIUS))
+        self.painter.draw_dots(qp, self.grid_size)
 
     def _draw_horizontal_lines(self, qp):
-        for r in range(self.grid_size):
-            for c in range(self.grid_size - 1):
-                self._draw_single_horizontal_line(qp, r, c)
-
-    def _draw_single_horizontal_line(self, qp, r, c):
-        is_last = self.blinking and self.blink_target and (r, c, True) == self.blink_target
-        if self.h_lines[r][c] and not (is_last and not self.blink_state):
-            qp.setPen(QPen(
-                Qt.blue if not is_last or self.blink_state else Qt.gray, 
-                LINE_THICKNESS, 
-                Qt.SolidLine if not is_last or self.blink_state else Qt.DashLine
-            ))
-            x1 = PADDING + c * BOX_SIZE + DOT_RADIUS
-            y1 = PADDING + r * BOX_SIZE
-            x2 = PADDING + (c + 1) * BOX_SIZE - DOT_RADIUS
-            y2 = y1
-            qp.drawLine(x1, y1, x2, y2)
+        self.painter.draw_horizontal_lines(qp, self, self.blink_target if self.blinking else None, self.blink_state)
 
     def _draw_vertical_lines(self, qp):
-        for r in range(self.grid_size - 1):
-            for c in range(self.grid_size):
-                is_last = self.blinking and self.blink_target and (r, c, False) == self.blink_target
-                if self.v_lines[r][c] and not (is_last and not self.blink_state):
-                    qp.setPen(QPen(
-                        Qt.red if not is_last or self.blink_state else Qt.gray, LINE_THICKNESS
-                    ))
-                    x1 = PADDING + c * BOX_SIZE
-                    y1 = PADDING + r * BOX_SIZE + DOT_RADIUS
-                    x2 = x1
-                    y2 = PADDING + (r + 1) * BOX_SIZE - DOT_RADIUS
-                    qp.drawLine(x1, y1, x2, y2)
+        self.painter.draw_vertical_lines(qp, self, self.blink_target if self.blinking else None, self.blink_state)
 
     def _draw_hover_shadows(self, qp):
         # Horizontal hover
@@ -130,27 +122,7 @@ class DotsAndBoxesBoard(QWidget):
                     qp.drawLine(x1, y1, x2, y2)
 
     def _draw_claimed_boxes(self, qp):
-        for r in range(self.grid_size - 1):
-            for c in range(self.grid_size - 1):
-                owner = self.boxes[r][c]
-                if owner is not None:
-                    color = QColor(200, 255, 200, 150) if owner == 0 else QColor(200, 200, 255, 150)
-                    qp.fillRect(
-                        QRectF(
-                            PADDING + c * BOX_SIZE + DOT_RADIUS,
-                            PADDING + r * BOX_SIZE + DOT_RADIUS,
-                            BOX_SIZE - 2 * DOT_RADIUS,
-                            BOX_SIZE - 2 * DOT_RADIUS,
-                        ),
-                        color,
-                    )
-                    qp.setPen(Qt.black)
-                    text = self.player1_name[:1].upper() if owner == 0 else "PC"
-                    qp.drawText(
-                        PADDING + c * BOX_SIZE + BOX_SIZE // 2 - 10,
-                        PADDING + r * BOX_SIZE + BOX_SIZE // 2 + 10,
-                        text
-                    )
+        self.painter.draw_claimed_boxes(qp, self, box_labels(self.player1_name))
 
     def _start_blink(self, move, blinks=2):
         self.blinking = True
@@ -187,24 +159,24 @@ class DotsAndBoxesBoard(QWidget):
         if r is None:
             return
 
-        if is_h:
-            if self.h_lines[r][c]:
-                return
-            self.h_lines[r][c] = True
-        else:
-            if self.v_lines[r][c]:
-                return
-            self.v_lines[r][c] = True
+        if (self.h_lines if is_h else self.v_lines)[r][c]:
+            return
+        self.make_move(r, c, is_h)
+        self.move_log.append((r, c, is_h, 0))
 
         self.last_move = (r, c, is_h)
         self._start_blink(self.last_move)
         made_box = self.check_and_update_boxes()
+        self._heatmap_moved(self.last_move)
         self.update()
         self.update_status()
         if not made_box:
             self.current_player = 1
+            self.ponderer.stop()
             self.update_status()
             QTimer.singleShot(400, self.computer_move)
+        elif not self.game_over:
+            self.start_pondering()  # Still the human's turn, from a new position
 
     def mouseMoveEvent(self, event):
         if self.blinking or self.game_over or self.current_player != 0:
@@ -265,35 +237,6 @@ class DotsAndBoxesBoard(QWidget):
         dist = ((lx - px) ** 2 + (ly - py) ** 2) ** 0.5
         return dist < tol
 
-    def check_and_update_boxes(self):
-        made_box = False
-        for r in range(self.grid_size - 1):
-            for c in range(self.grid_size - 1):
-                if self.boxes[r][c] is not None:
-                    continue
-                if (
-                    self.h_lines[r][c] and
-                    self.h_lines[r + 1][c] and
-                    self.v_lines[r][c] and
-                    self.v_lines[r][c + 1]
-                ):
-                    self.boxes[r][c] = self.current_player
-                    self.scores[self.current_player] += 1
-                    made_box = True
-        if self.is_game_over():
-            self.game_over = True
-            self.update_status()
-        return made_box
-
-    def is_game_over(self):
-        for row in self.h_lines:
-            if False in row:
-                return False
-        for row in self.v_lines:
-            if False in row:
-                return False
-        return True
-
     def update_status(self):
         if self.status_callback:
             self.status_callback("")
@@ -301,94 +244,17 @@ class DotsAndBoxesBoard(QWidget):
     def computer_move(self):
         if self.current_player != 1 or self.game_over or self.blinking:
             return
-        moves = self.available_moves()
-        move = self._find_box_completing_move(moves)
-        if move is None:
-            move = self._find_safe_move(moves)
-        if move is None:
-            move = self._find_least_damaging_move(moves)
-        self._execute_computer_move(move)
-
-    def _find_box_completing_move(self, moves):
-        for move in moves:
-            test = self.copy_state()
-            test.make_move(*move, player=1)
-            if test.check_and_update_boxes_for_move(*move, player=1):
-                return move
-        return None
-
-    def _find_safe_move(self, moves):
-        safe_moves = [move for move in moves if not self.move_makes_third_side(move)]
-        return random.choice(safe_moves) if safe_moves else None
-
-    def _find_least_damaging_move(self, moves):
-        # For each move, simulate and count the full chain of boxes the opponent could claim
-        min_chain = None
-        best_moves = []
-        for move in moves:
-            test = self.copy_state()
-            test.make_move(*move, player=1)
-            chain = test._simulate_opponent_chain()
-            if min_chain is None or chain < min_chain:
-                min_chain = chain
-                best_moves = [move]
-            elif chain == min_chain:
-                best_moves.append(move)
-        return random.choice(best_moves) if best_moves else random.choice(moves)
-
-    def _simulate_opponent_chain(self):
-        # Simulate the opponent's turn, recursively claiming all possible boxes in a chain
-        total = 0
-        while True:
-            moves = self.available_moves()
-            best = None
-            best_count = 0
-            for move in moves:
-                count = self._count_new_boxes(*move, player=0)
-                if count > best_count:
-                    best_count = count
-                    best = move
-            if best and best_count > 0:
-                self.make_move(*best, player=0)
-                self.check_and_update_boxes_for_move(*best, player=0)
-                total += best_count
-            else:
-                break
-        return total
-
-    def _count_new_boxes(self, r, c, is_h, player):
-        # Count how many boxes are completed by this move
-        count = 0
-        for rr, cc in self._adjacent_boxes(r, c, is_h):
-            if (
-                self.h_lines[rr][cc] and
-                self.h_lines[rr + 1][cc] and
-                self.v_lines[rr][cc] and
-                self.v_lines[rr][cc + 1] and
-                self.boxes[rr][cc] is None
-            ):
-                count += 1
-        return count
-
-    def _adjacent_boxes(self, r, c, is_h):
-        adjacent = []
-        if is_h:
-            if r > 0:
-                adjacent.append((r - 1, c))
-            if r < self.grid_size - 1:
-                adjacent.append((r, c))
-        else:
-            if c > 0:
-                adjacent.append((r, c - 1))
-            if c < self.grid_size - 1:
-                adjacent.append((r, c))
-        return adjacent
+        # Continue the pondered search of this position, if there is one
+        resume = self.ponderer.take(self) if self.budget.ponder else None
+        self._execute_computer_move(choose_move(self, self.budget, resume=resume))
 
     def _execute_computer_move(self, move):
         self.make_move(*move)
+        self.move_log.append((*move, 1))
         self.last_move = move
         self._start_blink(self.last_move)
         made_box = self.check_and_update_boxes()
+        self._heatmap_moved(move)
         self.update()
         self.update_status()
         if made_box:
@@ -396,91 +262,76 @@ class DotsAndBoxesBoard(QWidget):
         else:
             self.current_player = 0
             self.update_status()
+            self.start_pondering()
 
-    def available_moves(self):
-        moves = []
-        for r in range(self.grid_size):
-            for c in range(self.grid_size - 1):
-                if not self.h_lines[r][c]:
-                    moves.append((r, c, True))
-        for r in range(self.grid_size - 1):
-            for c in range(self.grid_size):
-                if not self.v_lines[r][c]:
-                    moves.append((r, c, False))
-        return moves
-
-    def move_makes_third_side(self, move):
-        r, c, is_h = move
-        if is_h:
-            # Top box
-            if r > 0 and self._box_has_two_sides(self.h_lines, self.v_lines, r - 1, c):
-                return True
-            # Bottom box
-            if r < self.grid_size - 1 and self._box_has_two_sides(self.h_lines, self.v_lines, r, c):
-                return True
-        else:
-            # Left box
-            if c > 0 and self._box_has_two_sides(self.h_lines, self.v_lines, r, c - 1):
-                return True
-            # Right box
-            if c < self.grid_size - 1 and self._box_has_two_sides(self.h_lines, self.v_lines, r, c):
-                return True
-        return False
+    def check_and_update_boxes(self):
+        was_over = self.game_over
+        made_box = super().check_and_update_boxes()
+        if self.game_over and not was_over and self.game_over_callback:
+            self.game_over_callback()
+        return made_box
 
-    def _box_has_two_sides(self, h_lines, v_lines, r, c):
-        n = 0
-        if h_lines[r][c]: n += 1
-        if h_lines[r + 1][c]: n += 1
-        if v_lines[r][c]: n += 1
-        if v_lines[r][c + 1]: n += 1
-        return n == 2
-
-    def copy_state(self):
-        new = DotsAndBoxesBoard()
-        new.grid_size = self.grid_size
-        new.h_lines = [row[:] for row in self.h_lines]
-        new.v_lines = [row[:] for row in self.v_lines]
-        new.boxes = [row[:] for row in self.boxes]
-        new.current_player = self.current_player
-        new.scores = self.scores[:]
-        new.game_over = self.game_over
-        new.last_move = self.last_move
-        new.blinking = self.blinking
-        new.blink_state = self.blink_state
-        new.blink_count = self.blink_count
-        new.blink_target = self.blink_target
-        return new
-
-    def make_move(self, r, c, is_h, player=None):
-        if is_h:
-            self.h_lines[r][c] = True
-        else:
-            self.v_lines[r][c] = True
-
-    def check_and_update_boxes_for_move(self, r, c, is_h, player):
-        made_box = False
-        # This only checks boxes *adjacent to this move*
-        adjacent = []
-        if is_h:
-            if r > 0:
-                adjacent.append((r - 1, c))
-            if r < self.grid_size - 1:
-                adjacent.append((r, c))
+    def start_pondering(self):
+        if self.budget.ponder and self.current_player == 0 and not self.game_over:
+            self.ponderer.start(self, self.budget)
+
+    def set_budget(self, budget):
+        # Anything pondered under the old level is dropped
+        self.budget = budget
+        self.ponderer.cancel()
+        self.start_pondering()
+
+    def set_heatmap_enabled(self, enabled):
+        self.heatmap_enabled = enabled
+        self.heatmap_layer = None
+        if enabled:
+            self.heatmap.reset(self)
+            self._start_heatmap()
         else:
-            if c > 0:
-                adjacent.append((r, c - 1))
-            if c < self.grid_size - 1:
-                adjacent.append((r, c))
-        for rr, cc in adjacent:
-            if (
-                self.h_lines[rr][cc] and
-                self.h_lines[rr + 1][cc] and
-                self.v_lines[rr][cc] and
-                self.v_lines[rr][cc + 1] and
-                self.boxes[rr][cc] is None
-            ):
-                made_box = True
-        return made_box
+            self.heatmap.stop()
+        self.update()
+
+    def _heatmap_moved(self, move):
+        if self.heatmap_enabled:
+            self.heatmap.note_move(self, move)
+            self._start_heatmap()
+
+    def _start_heatmap(self):
+        # Scored on a background thread; results arrive through heatmap_scored
+        self.heatmap.start(self, self.heatmap_scored.emit)
+        if not self.heatmap.dirty:
+            self._rebuild_heatmap_layer()  # Nothing to score (e.g. the board is full)
+            self.update()
+
+    def _heatmap_scored(self, generation, evaluated):
+        if self.heatmap_enabled and self.heatmap.apply(generation, evaluated):
+            self._rebuild_heatmap_layer()
+            self.update()
+
+    def _rebuild_heatmap_layer(self):
+        ratio = self.devicePixelRatioF()
+        layer = QPixmap(self.size() * ratio)
+        layer.setDevicePixelRatio(ratio)
+        layer.fill(Qt.transparent)
+        qp = QPainter(layer)
+        qp.setRenderHint(QPainter.Antialiasing)
+        for (r, c, is_h), (category, count) in self.heatmap.results.items():
+            if is_h:
+                x1 = PADDING + c * BOX_SIZE + DOT_RADIUS
+                y1 = y2 = PADDING + r * BOX_SIZE
+                x2 = PADDING + (c + 1) * BOX_SIZE - DOT_RADIUS
+            else:
+                x1 = x2 = PADDING + c * BOX_SIZE
+                y1 = PADDING + r * BOX_SIZE + DOT_RADIUS
+                y2 = PADDING + (r + 1) * BOX_SIZE - DOT_RADIUS
+            qp.setPen(QPen(HEATMAP_COLORS[category], LINE_THICKNESS + 6, Qt.SolidLine, Qt.RoundCap))
+            qp.drawLine(x1, y1, x2, y2)
+            if category != SAFE:
+                # Boxes taken (+N) or handed to the opponent (-N)
+                qp.setPen(Qt.black)
+                qp.drawText((x1 + x2) // 2 + 4, (y1 + y2) // 2 - 4, f"+{count}" if category == TAKES else f"-{count}")
+        qp.end()
+        self.heatmap_layer = layer
 
 class WhoGoesFirstDialog(QDialog):
     def __init__(
@@ -597,9 +448,234 @@ class WhoGoesFirstDialog(QDialog):
         else:
             self.anim_timer.start(self.anim_speeds[min(self.anim_index, len(self.anim_speeds)-1)])
 
+class StatsDialog(QDialog):
+    def __init__(self, player_name, history, parent=None):
+        """
+        Win/loss statistics by grid size, read from the game history.
+        :param player_name: Player whose games are summarized
+        :param history: HistoryStore
+        :param parent: Parent widget
+        """
+        super().__init__(parent)
+        self.setWindowTitle(f"Statistics for {player_name}")
+        layout = QVBoxLayout()
+        rows = history.stats_by_grid_size(player_name)
+        table = QTableWidget(len(rows), 7)
+        table.setHorizontalHeaderLabels(["Grid", "Games", "Wins", "Losses", "Ties", "Win rate", "Avg margin"])
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setSelectionMode(QTableWidget.NoSelection)
+        for i, (grid_size, games, wins, losses, ties, win_rate, avg_margin) in enumerate(rows):
+            cells = [
+                f"{grid_size}x{grid_size}", str(games), str(wins), str(losses), str(ties),
+                f"{win_rate:.0%}", f"{avg_margin:+.1f}",
+            ]
+            for col, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignCenter)
+                table.setItem(i, col, item)
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+        current, result, longest_win = history.streaks(player_name)
+        kind = {1: "win", 0: "tie", -1: "loss"}.get(result)
+        streak_text = f"Current streak: {current} {kind}{'s' if current != 1 else ''}" if kind else "No games played yet"
+        streak_label = QLabel(f"{streak_text}    Longest winning streak: {longest_win}")
+        streak_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(streak_label)
+        btn_box = QDialogButtonBox(QDialogButtonBox.Ok)
+        btn_box.accepted.connect(self.accept)
+        layout.addWidget(btn_box)
+        self.setLayout(layout)
+        self.setMinimumWidth(520)
+
+class ReplayDialog(QDialog):
+    def __init__(self, history, games, parent=None):
+        """
+        Step or scrub through recorded games.
+        :param history: HistoryStore
+        :param games: Games to offer, as returned by HistoryStore.recent_games()
+        :param parent: Parent widget
+        """
+        super().__init__(parent)
+        self.setWindowTitle("Replay Game")
+        self.history = history
+        self.replay = None
+        self.board = None
+        layout = QVBoxLayout()
+        self.game_box = QComboBox()
+        for game in games:
+            played = time.strftime("%Y-%m-%d %H:%M", time.localtime(game["played_at"]))
+            self.game_box.addItem(
+                f"{played}  {game['player']} {game['scores'][0]} - {game['scores'][1]} {game['opponent']}  "
+                f"({game['grid_size']}x{game['grid_size']})", game
+            )
+        self.game_box.currentIndexChanged.connect(self._load_game)
+        layout.addWidget(self.game_box)
+        self.board_box = QHBoxLayout()
+        layout.addLayout(self.board_box)
+        controls = QHBoxLayout()
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.valueChanged.connect(self.show_ply)
+        for text, step in (("|<", None), ("<", -1), (">", 1), (">|", None)):
+            btn = QPushButton(text)
+            btn.setFixedWidth(36)
+            if step is None:
+                btn.clicked.connect(self.slider.setMinimum if text == "|<" else self._to_end)
+            else:
+                btn.clicked.connect(lambda checked=False, step=step: self.slider.setValue(self.slider.value() + step))
+            controls.addWidget(btn)
+            if text == "<":
+                controls.addWidget(self.slider, 1)
+        layout.addLayout(controls)
+        self.ply_label = QLabel()
+        self.ply_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.ply_label)
+        self.setLayout(layout)
+        self._load_game(0)
+
+    def _to_end(self):
+        self.slider.setValue(self.slider.maximum())
+
+    def _load_game(self, index):
+        game = self.game_box.itemData(index)
+        self.replay = load_replay(self.history, game["id"])
+        if self.board is not None:
+            self.board_box.removeWidget(self.board)
+            self.board.deleteLater()
+        self.board = DotsAndBoxesBoard(game["grid_size"], game["player"])
+        self.board.setAttribute(Qt.WA_TransparentForMouseEvents)  # View only
+        self.board_box.addWidget(self.board, alignment=Qt.AlignCenter)
+        self.slider.blockSignals(True)
+        self.slider.setRange(0, len(self.replay))
+        self.slider.setValue(len(self.replay))
+        self.slider.blockSignals(False)
+        self.show_ply(len(self.replay))
+
+    def show_ply(self, ply):
+        # Nearest keyframe plus at most KEYFRAME_INTERVAL moves, so any jump is instant
+        state = self.replay.seek(ply)
+        board = self.board
+        board.h_lines = [row[:] for row in state.h_lines]
+        board.v_lines = [row[:] for row in state.v_lines]
+        board.boxes = [row[:] for row in state.boxes]
+        board.scores = state.scores[:]
+        # The hover shadow previews the next move
+        board.hovered_line = tuple(self.replay.moves[ply][:3]) if ply < len(self.replay) else None
+        board.update()
+        self.ply_label.setText(
+            f"Move {ply} of {len(self.replay)}    Score: {state.scores[0]} - {state.scores[1]}"
+        )
+
+class PuzzleBoard(DotsAndBoxesBoard):
+    # A board that reports the clicked line instead of playing a game
+    def __init__(self, grid_size, player1_name, move_callback, parent=None):
+        super().__init__(grid_size, player1_name, parent)
+        self.move_callback = move_callback
+
+    def mousePressEvent(self, event):
+        if self.game_over or self.blinking:
+            return
+        pos = event.position() if hasattr(event, 'position') else event.pos()
+        r, c, is_h = self.detect_line_clicked(pos.x(), pos.y())
+        if r is None or (self.h_lines if is_h else self.v_lines)[r][c]:
+            return
+        self.move_callback((r, c, is_h))
+
+class PuzzleDialog(QDialog):
+    THEME_HINTS = {
+        "decline": "Boxes are on offer, but taking them all loses.",
+        "sacrifice": "Sometimes you have to give something away.",
+        "quiet": "Only one quiet move keeps the win.",
+        "capture": "Only one capture wins.",
+    }
+
+    def __init__(self, pack, player1_name, parent=None):
+        """
+        Solve puzzles from a puzzle pack, one at a time (each is read from disk when shown).
+        :param pack: PuzzlePack
+        :param player1_name: Name shown on the player's boxes
+        :param parent: Parent widget
+        """
+        super().__init__(parent)
+        self.setWindowTitle("Puzzles")
+        self.pack = pack
+        self.player1_name = player1_name
+        self.index = 0
+        self.puzzle = None
+        self.board = None
+        layout = QVBoxLayout()
+        self.title_label = QLabel()
+        self.title_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.title_label)
+        self.board_box = QHBoxLayout()
+        layout.addLayout(self.board_box)
+        self.result_label = QLabel()
+        self.result_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.result_label)
+        buttons = QHBoxLayout()
+        for text, handler in (("Previous", self.previous_puzzle), ("Show solution", self.show_solution),
+                              ("Next", self.next_puzzle)):
+            btn = QPushButton(text)
+            btn.clicked.connect(handler)
+            buttons.addWidget(btn)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+        self.show_puzzle(0)
+
+    def show_puzzle(self, index):
+        self.index = index % len(self.pack)
+        self.puzzle = self.pack[self.index]
+        from puzzles import puzzle_state
+        state = puzzle_state(self.puzzle)
+        if state.current_player == 1:
+            # Whoever is to move in the puzzle is shown as the player
+            state.boxes = [[None if owner is None else 1 - owner for owner in row] for row in state.boxes]
+            state.scores.reverse()
+        if self.board is not None:
+            self.board_box.removeWidget(self.board)
+            self.board.deleteLater()
+        self.board = PuzzleBoard(state.grid_size, self.player1_name, self.try_move)
+        self.board.h_lines, self.board.v_lines, self.board.boxes = state.h_lines, state.v_lines, state.boxes
+        self.board.scores = state.scores
+        self.board_box.addWidget(self.board, alignment=Qt.AlignCenter)
+        self.title_label.setText(
+            f"Puzzle {self.index + 1} of {len(self.pack)}    Score: {state.scores[0]} - {state.scores[1]}\n"
+            f"Your move: find the only winning line. {self.THEME_HINTS.get(self.puzzle['theme'], '')}"
+        )
+        self.result_label.setText("")
+
+    def try_move(self, move):
+        solution = tuple(self.puzzle["solution"])
+        self.board.make_move(*move)
+        self.board.game_over = True  # One try per puzzle
+        if move == solution:
+            self.result_label.setText(f"Correct! Best play wins by {self.puzzle['margin']}.")
+            self.board._start_blink(move)
+        else:
+            self.result_label.setText("Not quite: that move does not win. The winning line is blinking.")
+            self.show_solution()
+        self.board.update()
+
+    def show_solution(self):
+        solution = tuple(self.puzzle["solution"])
+        self.board.game_over = True
+        self.board.make_move(*solution)
+        self.board._start_blink(solution, blinks=3)
+        if not self.result_label.text():
+            self.result_label.setText("The winning line is blinking.")
+
+    def previous_puzzle(self):
+        self.show_puzzle(self.index - 1)
+
+    def next_puzzle(self):
+        self.show_puzzle(self.index + 1)
+
 class DotsAndBoxesGame(QWidget):
-    def __init__(self, grid_size=GRID_SIZE):
+    def __init__(self, grid_size=GRID_SIZE, benchmark_startup=False):
         super().__init__()
+        self.benchmark_startup = benchmark_startup
+        self.first_paint_time = None
+        self.menu_stylesheet = None
         self.setWindowTitle("Dots and Boxes (Squares)")
         config = self.load_player_config()
         self.grid_size = config.get("grid_size", GRID_SIZE)
@@ -607,6 +683,9 @@ class DotsAndBoxesGame(QWidget):
         self.who_goes_first = config.get("who_goes_first", None)  # 0=player, 1=computer, 'random', None=ask
         self.remember_who_goes_first = config.get("remember_who_goes_first", False)
         self.dark_mode = config.get("dark_mode", None)
+        self.difficulty = config.get("difficulty", DEFAULT_LEVEL)
+        if self.difficulty not in LEVELS:
+            self.difficulty = DEFAULT_LEVEL
         self.menu_bar = QMenuBar(self)
         self.menu_bar.setNativeMenuBar(False)  # For cross-platform consistency
         self.game_menu = QMenu("Game Menu", self)
@@ -617,12 +696,31 @@ class DotsAndBoxesGame(QWidget):
         self.action_set_name = QAction("Set Player 1 Name", self)
         self.action_who_first = QAction("Who goes first...", self)
         self.action_toggle_dark = QAction("Toggle Dark/Light Mode", self)
+        self.action_heatmap = QAction("Show Move Heatmap", self)
+        self.action_heatmap.setCheckable(True)
+        self.action_stats = QAction("Statistics...", self)
+        self.action_replay = QAction("Replay Game...", self)
+        self.action_puzzles = QAction("Puzzles...", self)
         self.action_exit = QAction("Exit", self)
+        self.difficulty_menu = QMenu("Difficulty", self)
+        self.difficulty_group = QActionGroup(self)
+        self.difficulty_group.setExclusive(True)
+        for level in LEVELS:
+            action = QAction(level, self)
+            action.setCheckable(True)
+            action.setChecked(level == self.difficulty)
+            self.difficulty_group.addAction(action)
+            self.difficulty_menu.addAction(action)
         self.game_menu.addAction(self.action_new_same)
         self.game_menu.addAction(self.action_new_choose)
         self.game_menu.addAction(self.action_set_name)
         self.game_menu.addAction(self.action_who_first)
+        self.game_menu.addMenu(self.difficulty_menu)
         self.game_menu.addAction(self.action_toggle_dark)
+        self.game_menu.addAction(self.action_heatmap)
+        self.game_menu.addAction(self.action_stats)
+        self.game_menu.addAction(self.action_replay)
+        self.game_menu.addAction(self.action_puzzles)
         self.game_menu.addSeparator()
         self.game_menu.addAction(self.action_exit)
 
@@ -630,12 +728,21 @@ class DotsAndBoxesGame(QWidget):
         self.action_new_choose.triggered.connect(self.new_game_choose)
         self.action_set_name.triggered.connect(self.set_player1_name)
         self.action_exit.triggered.connect(self.close)
+        self.action_stats.triggered.connect(self.show_statistics)
+        self.action_replay.triggered.connect(self.show_replays)
+        self.action_puzzles.triggered.connect(self.show_puzzles)
         self.action_who_first.triggered.connect(self.show_who_goes_first_dialog)
         self.action_toggle_dark.triggered.connect(self.toggle_dark_mode)
+        self.action_heatmap.toggled.connect(self.toggle_heatmap)
+        self.difficulty_group.triggered.connect(self.set_difficulty)
 
         # Create the game board before adding to layout
         self.board = DotsAndBoxesBoard(self.grid_size, self.player1_name)
+        self.board.budget = LEVELS[self.difficulty]
         self.board.status_callback = self.update_status
+        self.board.game_over_callback = self.record_finished_game
+        self.history = None  # HistoryStore, opened on first use
+        self.history_unavailable = False  # Set if the database could not be opened
 
         # Scoreboard: QTableWidget
         self.scoreboard = QTableWidget(3, 2)
@@ -666,6 +773,7 @@ class DotsAndBoxesGame(QWidget):
         self.scoreboard.setRowHeight(0, 30)
         self.scoreboard.setRowHeight(1, 30)
         self.scoreboard.setRowHeight(2, 30)
+        self._build_scoreboard_items()
 
         # Status label for win/tie/game-over
         self.status_label = QLabel()
@@ -706,52 +814,86 @@ class DotsAndBoxesGame(QWidget):
             self.dark_mode = self.is_system_dark_mode()
             self.apply_dark_mode(self.dark_mode)
 
-        # Start a new game on app launch (shows 'Who goes first' dialog if needed)
-        QTimer.singleShot(0, lambda: self._start_new_game(self.grid_size, self.player1_name))
+        self.constructed_time = time.perf_counter()
+        # The first game (and its 'Who goes first' dialog) starts after the window has painted
+
+    def paintEvent(self, event):
+        # NOTE: Qt event handler name, like DotsAndBoxesBoard.paintEvent.
+        super().paintEvent(event)
+        if self.first_paint_time is None:
+            self.first_paint_time = time.perf_counter()
+            QTimer.singleShot(0, self._after_first_paint)
+
+    def _after_first_paint(self):
+        if self.benchmark_startup:
+            print(
+                f"Startup: imports {(IMPORT_DONE_TIME - STARTUP_TIME) * 1000:.1f} ms, "
+                f"window built {(self.constructed_time - STARTUP_TIME) * 1000:.1f} ms, "
+                f"first paint {(self.first_paint_time - STARTUP_TIME) * 1000:.1f} ms"
+            )
+            QApplication.instance().quit()
+            return
+        # Deferred work: app-wide menu stylesheet, AI caches (in the background), then the first game
+        if self.menu_stylesheet is not None:
+            QApplication.instance().setStyleSheet(self.menu_stylesheet)
+        threading.Thread(target=preload_ai_tables, daemon=True).start()
+        self._start_new_game(self.grid_size, self.player1_name)
+
+    def _build_scoreboard_items(self):
+        # Items, fonts and the header span are created once; _refresh_status only edits what changed
+        self.normal_font = QTableWidgetItem().font()
+        self.bold_font = QTableWidgetItem().font()
+        self.bold_font.setBold(True)
+        self.scoreboard_cells = {}  # (row, col) -> (text, highlighted) currently shown
+        self.status_refresh_pending = False
+        self.pending_status_msg = None
+        for row, col in ((0, 0), (1, 0), (1, 1), (2, 0), (2, 1)):
+            item = QTableWidgetItem()
+            item.setTextAlignment(Qt.AlignCenter)
+            self.scoreboard.setItem(row, col, item)
+        header_item = self.scoreboard.item(0, 0)
+        header_item.setForeground(Qt.white)
+        header_item.setFont(self.bold_font)
+        header_item.setFlags(Qt.ItemIsEnabled)
+        self.scoreboard.setSpan(0, 0, 1, 2)
+
+    def _set_scoreboard_cell(self, row, col, text, highlighted=False):
+        if self.scoreboard_cells.get((row, col)) == (text, highlighted):
+            return
+        item = self.scoreboard.item(row, col)
+        item.setText(text)
+        if row == 1:
+            # Highlight the current player's name
+            if highlighted:
+                item.setBackground(Qt.white)
+                item.setForeground(Qt.black)
+                item.setFont(self.bold_font)
+            else:
+                item.setData(Qt.BackgroundRole, None)
+                item.setData(Qt.ForegroundRole, None)
+                item.setFont(self.normal_font)
+        self.scoreboard_cells[(row, col)] = (text, highlighted)
 
     def update_status(self, msg=None):
+        # The board reports several times per move; coalesce into one refresh per event-loop tick
+        self.pending_status_msg = msg
+        if not self.status_refresh_pending:
+            self.status_refresh_pending = True
+            QTimer.singleShot(0, self._refresh_status)
+
+    def _refresh_status(self):
+        self.status_refresh_pending = False
+        msg = self.pending_status_msg
         player_name = self.player1_name
         computer_name = "Computer"
         scores = self.board.scores
         current_player = self.board.current_player
         game_over = self.board.game_over
-        # Header
-        header_item = QTableWidgetItem("Score")
-        header_item.setTextAlignment(Qt.AlignCenter)
-        header_item.setForeground(Qt.white)
-        font = header_item.font()
-        font.setBold(True)
-        header_item.setFont(font)
-        header_item.setFlags(Qt.ItemIsEnabled)
-        self.scoreboard.setItem(0, 0, header_item)
-        self.scoreboard.setSpan(0, 0, 1, 2)
-        # Player names
-        player_item = QTableWidgetItem(player_name)
-        player_item.setTextAlignment(Qt.AlignCenter)
-        computer_item = QTableWidgetItem(computer_name)
-        computer_item.setTextAlignment(Qt.AlignCenter)
-        # Highlight current player name
-        if current_player == 0 and not game_over:
-            player_item.setBackground(Qt.white)
-            player_item.setForeground(Qt.black)
-            font = player_item.font()
-            font.setBold(True)
-            player_item.setFont(font)
-        if current_player == 1 and not game_over:
-            computer_item.setBackground(Qt.white)
-            computer_item.setForeground(Qt.black)
-            font = computer_item.font()
-            font.setBold(True)
-            computer_item.setFont(font)
-        self.scoreboard.setItem(1, 0, player_item)
-        self.scoreboard.setItem(1, 1, computer_item)
-        # Scores
-        player_score_item = QTableWidgetItem(str(scores[0]))
-        player_score_item.setTextAlignment(Qt.AlignCenter)
-        computer_score_item = QTableWidgetItem(str(scores[1]))
-        computer_score_item.setTextAlignment(Qt.AlignCenter)
-        self.scoreboard.setItem(2, 0, player_score_item)
-        self.scoreboard.setItem(2, 1, computer_score_item)
+        self._set_scoreboard_cell(0, 0, "Score")
+        self._set_scoreboard_cell(1, 0, player_name, current_player == 0 and not game_over)
+        self._set_scoreboard_cell(1, 1, computer_name, current_player == 1 and not game_over)
+        self._set_scoreboard_cell(2, 0, str(scores[0]))
+        self._set_scoreboard_cell(2, 1, str(scores[1]))
         # Status message
         if game_over:
             if scores[0] > scores[1]:
@@ -803,10 +945,15 @@ class DotsAndBoxesGame(QWidget):
         return who_first
 
     def _reset_board_and_start(self, grid_size, player1_name, who_first):
+        self.board.ponderer.cancel()
+        self.board.heatmap.stop()
         self.layout().removeWidget(self.board)
         self.board.deleteLater()
         self.board = DotsAndBoxesBoard(grid_size, player1_name)
+        self.board.budget = LEVELS[self.difficulty]
         self.board.status_callback = self.update_status
+        self.board.game_over_callback = self.record_finished_game
+        self.board.set_heatmap_enabled(self.action_heatmap.isChecked())
         self.layout().insertWidget(1, self.board)  # after scoreboard
         self.update_status("")
         if who_first == 1:
@@ -814,6 +961,7 @@ class DotsAndBoxesGame(QWidget):
             QTimer.singleShot(400, self.board.computer_move)
         else:
             self.board.current_player = 0
+            self.board.start_pondering()
         self.save_player_config(
             player1_name, grid_size, self.who_goes_first if self.remember_who_goes_first else None, 
             self.remember_who_goes_first
@@ -870,7 +1018,8 @@ class DotsAndBoxesGame(QWidget):
                     "player1_name": player1_name,
                     "grid_size": grid_size,
                     "who_goes_first": who_goes_first,
-                    "remember_who_goes_first": remember_who_goes_first
+                    "remember_who_goes_first": remember_who_goes_first,
+                    "difficulty": self.difficulty
                 }
                 if dark_mode is not None:
                     config["dark_mode"] = dark_mode
@@ -878,6 +1027,63 @@ class DotsAndBoxesGame(QWidget):
         except Exception:
             pass
 
+    def history_store(self):
+        # None if the database cannot be opened (read-only, locked or corrupt): play on without history
+        if self.history is None and not self.history_unavailable:
+            try:
+                self.history = HistoryStore()
+            except sqlite3.Error as e:
+                self.history_unavailable = True
+                print(f"Game history disabled: {e}", file=sys.stderr)
+        return self.history
+
+    def record_finished_game(self):
+        # Queued for the history writer thread; nothing blocks the UI
+        history = self.history_store()
+        if history is None:
+            return
+        history.record_game(
+            self.player1_name, "Computer", self.board.grid_size, self.board.scores[:], self.board.move_log[:]
+        )
+
+    def show_history_unavailable(self, title):
+        QMessageBox.information(self, title, "The game history database could not be opened.")
+
+    def show_statistics(self):
+        history = self.history_store()
+        if history is None:
+            self.show_history_unavailable("Statistics")
+            return
+        history.flush()  # Include the game that just ended
+        StatsDialog(self.player1_name, history, self).exec()
+
+    def show_replays(self):
+        history = self.history_store()
+        if history is None:
+            self.show_history_unavailable("Replay Game")
+            return
+        history.flush()
+        games = history.recent_games()
+        if not games:
+            QMessageBox.information(self, "Replay Game", "No recorded games yet.")
+            return
+        ReplayDialog(history, games, self).exec()
+
+    def show_puzzles(self):
+        from puzzles import PuzzlePack, PUZZLE_FILE  # Imported here so NumPy stays off the startup path
+        try:
+            pack = PuzzlePack(PUZZLE_FILE)
+        except OSError:
+            pack = None
+        if not pack:
+            QMessageBox.information(
+                self, "Puzzles", "No puzzle pack found. Generate one with:\n"
+                "python puzzles.py --data selfplay_data --out puzzles.jsonl"
+            )
+            return
+        PuzzleDialog(pack, self.player1_name, self).exec()
+        pack.close()
+
     def handle_show_last_move(self):
         self.board.show_last_move()
 
@@ -900,6 +1106,18 @@ class DotsAndBoxesGame(QWidget):
             self.remember_who_goes_first, self.dark_mode
         )
 
+    def set_difficulty(self, action):
+        # Takes effect from the computer's next move, in the current game too
+        self.difficulty = action.text()
+        self.board.set_budget(LEVELS[self.difficulty])
+        self.save_player_config(
+            self.player1_name, self.grid_size, self.who_goes_first if self.remember_who_goes_first else None,
+            self.remember_who_goes_first, self.dark_mode
+        )
+
+    def toggle_heatmap(self, checked):
+        self.board.set_heatmap_enabled(checked)
+
     def apply_dark_mode(self, enabled):
         app = QApplication.instance()
         if enabled:
@@ -925,7 +1143,7 @@ class DotsAndBoxesGame(QWidget):
             dark_palette.setColor(QPalette.Shadow, QColor('#1a2233'))
             app.setPalette(dark_palette)
             self._set_scoreboard_text_color('white')
-            app.setStyleSheet("""
+            self._set_menu_stylesheet("""
                 QMenu {
                     background-color: #2a3a5a;
                     color: white;
@@ -979,7 +1197,7 @@ class DotsAndBoxesGame(QWidget):
             light_palette.setColor(QPalette.Shadow, QColor('#b0bed9'))
             app.setPalette(light_palette)
             self._set_scoreboard_text_color('#222b3a')
-            app.setStyleSheet("""
+            self._set_menu_stylesheet("""
                 QMenu {
                     background-color: #eaf0fa;
                     color: #222b3a;
@@ -1011,6 +1229,12 @@ class DotsAndBoxesGame(QWidget):
                 """
             )
 
+    def _set_menu_stylesheet(self, stylesheet):
+        # An app-wide stylesheet repolishes every widget, so on startup it waits for the first paint
+        self.menu_stylesheet = stylesheet
+        if self.first_paint_time is not None:
+            QApplication.instance().setStyleSheet(stylesheet)
+
     def _set_scoreboard_text_color(self, color):
         self.scoreboard.setStyleSheet(f"""
             QTableWidget {{
@@ -1026,14 +1250,24 @@ class DotsAndBoxesGame(QWidget):
             }}
         """)
 
+    def closeEvent(self, event):
+        # NOTE: Qt event handler name, like paintEvent.
+        self.board.ponderer.cancel()
+        self.board.heatmap.stop()
+        if self.history is not None:
+            self.history.close()
+        save_nimber_cache()
+        super().closeEvent(event)
+
     def is_system_dark_mode(self):
         # Simple heuristic: check palette background color
         app = QApplication.instance()
         return app.palette().color(QPalette.Window).value() < 128
 
 def main():
-    app = QApplication(sys.argv)
-    game = DotsAndBoxesGame()
+    benchmark_startup = "--benchmark-startup" in sys.argv
+    app = QApplication([arg for arg in sys.argv if arg != "--benchmark-startup"])
+    game = DotsAndBoxesGame(benchmark_startup=benchmark_startup)
     game.show()
     sys.exit(app.exec())
 
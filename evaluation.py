@@ -0,0 +1,276 @@
+"""
+Optional learned evaluation function for Dots and Boxes positions.
+
+A small linear or one-hidden-layer model over hand-picked board features (side
+counts, chain lengths, long-chain parity, score difference) predicts the final
+outcome for the player to move. Inference is pure NumPy and batched: all child
+positions of a node are scored with one matrix multiply. Weights are trained
+from selfplay.py data and loaded lazily from a .npz file; without NumPy or a
+weights file the evaluator simply reports itself unavailable.
+
+Usage:
+    python evaluation.py --data selfplay_data --out evaluator_weights.npz
+"""
+import os
+import sys
+import argparse
+
+WEIGHTS_FILE = os.path.join(os.path.dirname(__file__), "evaluator_weights.npz")
+FEATURE_NAMES = (
+    "sides0", "sides1", "sides2", "sides3",  # Fraction of open boxes with 0-3 sides drawn
+    "short_chains", "long_chains", "long_chain_boxes",
+    "long_chain_parity",  # 1 if (dots + long chains) parity favours the player to move
+    "score_diff", "remaining",
+    "bias",
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: the hand-written AI tiers work without it
+    np = None
+
+
+def _chain_lengths(state):
+    # Chains are runs of open boxes with exactly two sides drawn, linked through undrawn lines
+    n = state.grid_size
+    two_sided = set()
+    for r in range(n - 1):
+        for c in range(n - 1):
+            if state.boxes[r][c] is None and state._box_has_two_sides(state.h_lines, state.v_lines, r, c):
+                two_sided.add((r, c))
+    lengths = []
+    seen = set()
+    for start in two_sided:
+        if start in seen:
+            continue
+        seen.add(start)
+        stack = [start]
+        length = 0
+        while stack:
+            r, c = stack.pop()
+            length += 1
+            for (rr, cc), drawn in (
+                ((r - 1, c), state.h_lines[r][c]), ((r + 1, c), state.h_lines[r + 1][c]),
+                ((r, c - 1), state.v_lines[r][c]), ((r, c + 1), state.v_lines[r][c + 1]),
+            ):
+                if not drawn and (rr, cc) in two_sided and (rr, cc) not in seen:
+                    seen.add((rr, cc))
+                    stack.append((rr, cc))
+        lengths.append(length)
+    return lengths
+
+
+def position_features(state):
+    """
+    Feature vector of a position, from the point of view of the player to move.
+    :param state: BoardState or DotsAndBoxesBoard
+    :return: List of floats in FEATURE_NAMES order
+    """
+    n = state.grid_size
+    total_boxes = (n - 1) ** 2
+    sides = [0, 0, 0, 0]
+    for r in range(n - 1):
+        for c in range(n - 1):
+            if state.boxes[r][c] is None:
+                drawn = state.h_lines[r][c] + state.h_lines[r + 1][c] + state.v_lines[r][c] + state.v_lines[r][c + 1]
+                if drawn < 4:
+                    sides[drawn] += 1
+    lengths = _chain_lengths(state)
+    long_chains = [length for length in lengths if length >= 3]
+    moves_left = len(state.available_moves())
+    moves_made = 2 * n * (n - 1) - moves_left
+    # Long chain rule: the first player wants dots + long chains to be even. Turns alternate on every
+    # move that claims nothing, so claimed boxes approximate the extra turns taken so far.
+    is_first_player = (moves_made - sum(state.scores)) % 2 == 0
+    parity_even = (n * n + len(long_chains)) % 2 == 0
+    me = state.current_player
+    return [
+        sides[0] / total_boxes, sides[1] / total_boxes, sides[2] / total_boxes, sides[3] / total_boxes,
+        (len(lengths) - len(long_chains)) / total_boxes, len(long_chains) / total_boxes,
+        sum(long_chains) / total_boxes,
+        1.0 if parity_even == is_first_player else 0.0,
+        (state.scores[me] - state.scores[1 - me]) / total_boxes,
+        moves_left / (2 * n * (n - 1)),
+        1.0,
+    ]
+
+
+def child_positions(state):
+    """
+    Apply every available move to a copy of the position.
+    :return: List of (move, child state, True if the same player moves again in the child)
+    """
+    children = []
+    for move in state.available_moves():
+        child = state.copy_state()
+        child.make_move(*move)
+        keeps_turn = child.check_and_update_boxes()
+        if not keeps_turn:
+            child.current_player = 1 - child.current_player
+        children.append((move, child, keeps_turn))
+    return children
+
+
+class LearnedEvaluator:
+    def __init__(self, weights_path=WEIGHTS_FILE):
+        """
+        Linear/MLP position evaluator with lazily loaded weights.
+        :param weights_path: .npz file with W1, b1 and optionally W2, b2 (hidden layer)
+        """
+        self.weights_path = weights_path
+        self._weights = None
+
+    @property
+    def available(self):
+        return np is not None and (self._weights is not None or os.path.exists(self.weights_path))
+
+    @property
+    def weights(self):
+        if self._weights is None:
+            with np.load(self.weights_path) as data:
+                self._weights = {name: data[name] for name in data.files}
+        return self._weights
+
+    def predict(self, features):
+        """
+        Predicted outcome (-1 loss .. 1 win) for the player to move, one per feature row.
+        :param features: Array-like of shape (positions, len(FEATURE_NAMES))
+        """
+        w = self.weights
+        x = np.asarray(features, dtype=np.float32)
+        if "W2" in w:
+            x = np.maximum(x @ w["W1"] + w["b1"], 0.0)
+            return np.tanh(x @ w["W2"] + w["b2"]).ravel()
+        return np.tanh(x @ w["W1"] + w["b1"]).ravel()
+
+    def evaluate_children(self, state):
+        """
+        Score every move of a position with one batched forward pass.
+        :return: List of (move, value for the player to move in `state`)
+        """
+        children = child_positions(state)
+        if not children:
+            return []
+        values = self.predict([position_features(child) for _, child, _ in children])
+        return [
+            (move, float(value) if keeps_turn else -float(value))
+            for (move, child, keeps_turn), value in zip(children, values)
+        ]
+
+    def best_move(self, state, moves=None):
+        scored = self.evaluate_children(state)
+        if moves is not None:
+            allowed = set(moves)
+            scored = [item for item in scored if item[0] in allowed]
+        return max(scored, key=lambda item: item[1])[0] if scored else None
+
+
+_default_evaluator = None
+
+
+def default_evaluator():
+    """
+    Shared evaluator for WEIGHTS_FILE, or None if NumPy or the weights are missing.
+    """
+    global _default_evaluator
+    if _default_evaluator is None:
+        _default_evaluator = LearnedEvaluator()
+    return _default_evaluator if _default_evaluator.available else None
+
+
+# --- Training ---
+
+def state_from_record(record):
+    from board_state import BoardState
+    n = record["grid_size"]
+    state = BoardState(n)
+    h_bits = iter(record["h_lines"])
+    v_bits = iter(record["v_lines"])
+    for r in range(n):
+        for c in range(n - 1):
+            if next(h_bits) == "1":
+                state.make_move(r, c, True)
+    for r in range(n - 1):
+        for c in range(n):
+            if next(v_bits) == "1":
+                state.make_move(r, c, False)
+    for r in range(n - 1):
+        for c in range(n - 1):
+            if state.h_lines[r][c] and state.h_lines[r + 1][c] and state.v_lines[r][c] and state.v_lines[r][c + 1]:
+                state.boxes[r][c] = 0  # Owner is not recorded; only "claimed" matters for features
+    state.scores = list(record["scores"])
+    state.current_player = record["to_move"]
+    return state
+
+
+def load_training_set(data_dir, limit=None):
+    from selfplay import read_records
+    features = []
+    targets = []
+    for record in read_records(data_dir):
+        features.append(position_features(state_from_record(record)))
+        targets.append(record["outcome"])
+        if limit and len(targets) >= limit:
+            break
+    return np.asarray(features, dtype=np.float32), np.asarray(targets, dtype=np.float32)
+
+
+def train(x, y, hidden=16, epochs=20, batch_size=512, lr=0.05, seed=0):
+    """
+    Fit a tanh-output model by minibatch gradient descent on squared error.
+    :param hidden: Hidden units (0 = linear model)
+    :return: Dict of weight arrays ready for np.savez
+    """
+    rng = np.random.default_rng(seed)
+    n_features = x.shape[1]
+    if hidden:
+        w = {
+            "W1": rng.normal(0, 1 / np.sqrt(n_features), (n_features, hidden)).astype(np.float32),
+            "b1": np.zeros(hidden, dtype=np.float32),
+            "W2": rng.normal(0, 1 / np.sqrt(hidden), (hidden, 1)).astype(np.float32),
+            "b2": np.zeros(1, dtype=np.float32),
+        }
+    else:
+        w = {"W1": np.zeros((n_features, 1), dtype=np.float32), "b1": np.zeros(1, dtype=np.float32)}
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        for start in range(0, len(y), batch_size):
+            idx = order[start:start + batch_size]
+            xb, yb = x[idx], y[idx, None]
+            if hidden:
+                h_pre = xb @ w["W1"] + w["b1"]
+                h = np.maximum(h_pre, 0.0)
+                out = np.tanh(h @ w["W2"] + w["b2"])
+                grad_out = (out - yb) * (1 - out ** 2) / len(idx)
+                grad_h = (grad_out @ w["W2"].T) * (h_pre > 0)
+                w["W2"] -= lr * h.T @ grad_out
+                w["b2"] -= lr * grad_out.sum(axis=0)
+                w["W1"] -= lr * xb.T @ grad_h
+                w["b1"] -= lr * grad_h.sum(axis=0)
+            else:
+                out = np.tanh(xb @ w["W1"] + w["b1"])
+                grad_out = (out - yb) * (1 - out ** 2) / len(idx)
+                w["W1"] -= lr * xb.T @ grad_out
+                w["b1"] -= lr * grad_out.sum(axis=0)
+    return w
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the learned evaluator from self-play data.")
+    parser.add_argument("--data", default="selfplay_data", help="Directory written by selfplay.py")
+    parser.add_argument("--out", default=WEIGHTS_FILE, help="Output .npz weights file")
+    parser.add_argument("--hidden", type=int, default=16, help="Hidden units (0 = linear model)")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many records")
+    args = parser.parse_args(argv)
+    if np is None:
+        sys.exit("Training the evaluator requires NumPy (pip install numpy).")
+    x, y = load_training_set(args.data, args.limit)
+    weights = train(x, y, hidden=args.hidden, epochs=args.epochs)
+    np.savez(args.out, **weights)
+    out = LearnedEvaluator(args.out).predict(x)
+    print(f"Trained on {len(y)} positions, mean squared error {float(np.mean((out - y) ** 2)):.4f}")
+
+
+if __name__ == "__main__":
+    main()
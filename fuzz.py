@@ -0,0 +1,264 @@
+"""
+Differential fuzzing of the game rules.
+
+Random games on every grid size are played move by move on the reference
+rules (GameRules, the list-based logic the game board uses) and on one or more
+alternative backends. After every move the backends must agree with the
+reference on the boxes claimed, whether the mover keeps the turn, the scores,
+is_game_over() and the available moves. A failing game is shrunk to a minimal
+move list that still shows the disagreement (every order of distinct lines is a
+legal game, so moves can be dropped freely).
+
+A backend is any class with reset(grid_size), play((r, c, is_h)) returning the
+number of boxes claimed, and current_player / scores / is_game_over() /
+available_moves(). Built-in alternatives are the bitmask rules used by the
+tablebase and exact solver, and the replay viewer's move application; others are
+loaded with --backend module:Class.
+
+Usage:
+    python fuzz.py --plies 1000000
+    python fuzz.py --backend my_engine:FastBoard --grid-sizes 5,10
+"""
+import sys
+import random
+import argparse
+import importlib
+from itertools import count
+from multiprocessing import Pool
+
+from board_state import BoardState
+from pool_feed import BoundedFeed
+from tablebase import edge_list, box_masks, edge_gain
+from replay import apply_move
+
+GRID_SIZES = range(3, 11)  # Same range as the game's grid size dialog
+
+
+class ReferenceBackend:
+    # GameRules as the board widget drives it: draw, check boxes, pass the turn if none were made
+    def reset(self, grid_size):
+        self.state = BoardState(grid_size)
+
+    def play(self, move):
+        state = self.state
+        before = state.scores[state.current_player]
+        state.make_move(*move)
+        if not state.check_and_update_boxes():
+            state.current_player = 1 - state.current_player
+            return 0
+        return state.scores[state.current_player] - before
+
+    @property
+    def current_player(self):
+        return self.state.current_player
+
+    @property
+    def scores(self):
+        return self.state.scores
+
+    def is_game_over(self):
+        return self.state.is_game_over()
+
+    def available_moves(self):
+        return self.state.available_moves()
+
+
+class BitmaskBackend:
+    # The tablebase / endgame solver rules: one int of drawn lines, box completion by side masks
+    def reset(self, grid_size):
+        self.edges = edge_list(grid_size)
+        self.index = {edge: i for i, edge in enumerate(self.edges)}
+        self.masks = box_masks(grid_size)
+        self.full = (1 << len(self.edges)) - 1
+        self.mask = 0
+        self.current_player = 0
+        self.scores = [0, 0]
+
+    def play(self, move):
+        e = self.index[move]
+        gain = edge_gain(self.mask, e, self.masks)
+        self.mask |= 1 << e
+        if gain:
+            self.scores[self.current_player] += gain
+        else:
+            self.current_player = 1 - self.current_player
+        return gain
+
+    def is_game_over(self):
+        return self.mask == self.full
+
+    def available_moves(self):
+        return [edge for i, edge in enumerate(self.edges) if not self.mask >> i & 1]
+
+
+class ReplayBackend(ReferenceBackend):
+    # replay.apply_move: only the boxes next to the new line are checked
+    def play(self, move):
+        state = self.state
+        player = state.current_player
+        before = state.scores[player]
+        apply_move(state, (*move, player))
+        gain = state.scores[player] - before
+        if not gain:
+            state.current_player = 1 - player
+        return gain
+
+
+BACKENDS = {
+    "bitmask": BitmaskBackend,
+    "replay": ReplayBackend,
+}
+
+
+def load_backend(name):
+    """
+    A BACKENDS name or "module:Class".
+    """
+    if name in BACKENDS:
+        return BACKENDS[name]
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown backend {name!r}: use one of {', '.join(BACKENDS)} or module:Class")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _observe(backend, claimed):
+    return {
+        "claimed": claimed,
+        "player": backend.current_player,
+        "scores": list(backend.scores),
+        "game_over": bool(backend.is_game_over()),
+        "available": sorted(backend.available_moves()),
+    }
+
+
+def first_mismatch(grid_size, moves, backend_class):
+    """
+    Play `moves` on the reference and on a backend.
+    :return: (moves played, field, reference value, backend value) at the first disagreement, or None
+    """
+    reference, other = ReferenceBackend(), backend_class()
+    reference.reset(grid_size)
+    expected = _observe(reference, 0)
+    ply = 0
+    try:
+        other.reset(grid_size)
+        actual = _observe(other, 0)
+        while expected == actual:
+            if ply == len(moves):
+                return None
+            move = moves[ply]
+            ply += 1
+            expected = _observe(reference, reference.play(move))
+            actual = _observe(other, other.play(move))
+    except Exception as e:  # A crashing backend disagrees too
+        return ply, "exception", None, repr(e)
+    field = next(key for key in expected if expected[key] != actual[key])
+    return ply, field, expected[field], actual[field]
+
+
+def shrink(grid_size, moves, backend_class):
+    """
+    Drop moves (in halving chunks, down to single moves) while the backend still disagrees.
+    :return: Minimal failing move list (no single move can be removed)
+    """
+    found = first_mismatch(grid_size, moves, backend_class)
+    moves = moves[:found[0]]
+    chunk = max(1, len(moves) // 2)
+    while True:
+        i = 0
+        while i < len(moves):
+            candidate = moves[:i] + moves[i + chunk:]
+            found = first_mismatch(grid_size, candidate, backend_class)
+            if found is not None:
+                moves = candidate[:found[0]]
+            else:
+                i += chunk
+        if chunk == 1:
+            return moves
+        chunk = max(1, chunk // 2)
+
+
+def random_game(grid_size, rng):
+    moves = edge_list(grid_size)
+    rng.shuffle(moves)
+    return moves
+
+
+def fuzz_games(task):
+    """
+    Play a block of random games against every backend.
+    :return: (plies played, failures as dicts with the shrunk move list)
+    """
+    first_seed, games, grid_sizes, backend_names = task
+    backends = [(name, load_backend(name)) for name in backend_names]
+    plies = 0
+    failures = []
+    for seed in range(first_seed, first_seed + games):
+        rng = random.Random(seed)
+        grid_size = grid_sizes[seed % len(grid_sizes)]
+        moves = random_game(grid_size, rng)
+        for name, backend_class in backends:
+            plies += len(moves)
+            if first_mismatch(grid_size, moves, backend_class) is None:
+                continue
+            minimal = shrink(grid_size, moves, backend_class)
+            ply, field, expected, actual = first_mismatch(grid_size, minimal, backend_class)
+            failures.append({
+                "backend": name, "seed": seed, "grid_size": grid_size, "moves": minimal,
+                "ply": ply, "field": field, "expected": expected, "actual": actual,
+            })
+    return plies, failures
+
+
+def run(backend_names, plies=1_000_000, grid_sizes=GRID_SIZES, workers=None, games_per_task=20, seed=0,
+        max_failures=10):
+    """
+    Fuzz until `plies` plies have been compared (summed over backends) or max_failures are found.
+    :return: List of failures
+    """
+    grid_sizes = list(grid_sizes)
+    # Tasks are generated until enough plies are done, a few in flight per worker
+    tasks = BoundedFeed(((seed + i * games_per_task, games_per_task, grid_sizes, backend_names) for i in count()),
+                        workers)
+    done = 0
+    failures = []
+    with Pool(workers) as pool:
+        for plies_done, found in pool.imap_unordered(fuzz_games, tasks):
+            tasks.done()
+            done += plies_done
+            failures.extend(found)
+            for failure in found:
+                print(f"MISMATCH {failure['backend']} on {failure['grid_size']}x{failure['grid_size']} "
+                      f"(seed {failure['seed']}): {failure['field']} after move {failure['ply']} "
+                      f"expected {failure['expected']!r}, got {failure['actual']!r}; "
+                      f"moves {failure['moves']}", file=sys.stderr)
+            if len(failures) >= max_failures or done >= plies:
+                tasks.close()
+                break
+    print(f"{done} plies compared, {len(failures)} mismatches", file=sys.stderr)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Differential fuzzing of Dots and Boxes rule backends.")
+    parser.add_argument("--backend", action="append", default=None,
+                        help=f"Backend to check ({', '.join(BACKENDS)} or module:Class); repeatable, default all built-in")
+    parser.add_argument("--plies", type=int, default=1_000_000, help="Plies to compare in total")
+    parser.add_argument("--grid-sizes", default=",".join(str(n) for n in GRID_SIZES), help="Comma-separated grid sizes")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="First game seed")
+    args = parser.parse_args(argv)
+    backend_names = args.backend or list(BACKENDS)
+    for name in backend_names:
+        try:
+            load_backend(name)
+        except (ValueError, ImportError, AttributeError) as e:
+            parser.error(str(e))
+    grid_sizes = [int(n) for n in args.grid_sizes.split(",") if n.strip()]
+    failures = run(backend_names, args.plies, grid_sizes, args.workers, seed=args.seed)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Move evaluation heatmap: the outcome of every free line for the player to move.
+
+Each free line is classified as TAKES (completes N boxes), SAFE (hands over
+nothing) or GIVES (the opponent can then take a chain of N boxes, measured with
+the computer's own _simulate_opponent_chain rollout). Results are cached with
+the set of boxes each evaluation looked at; after a move only lines whose
+footprint touches the boxes next to that move are marked dirty and re-scored.
+
+Dirty lines are scored on a background thread working on a copy of the board,
+so rollouts never run on the GUI thread; results are posted back in batches
+and applied there, and results scored before a later move are dropped.
+"""
+import threading
+
+BATCH = 8  # Lines scored between posts back to the caller
+
+TAKES = "takes"
+SAFE = "safe"
+GIVES = "gives"
+
+
+class MoveHeatmap:
+    def __init__(self):
+        self.results = {}  # (r, c, is_h) -> (category, boxes)
+        self.footprints = {}  # (r, c, is_h) -> set of boxes the evaluation depended on
+        self.dirty = set()
+        self.generation = 0  # Bumped by every start(); results of older runs are stale
+        self._stop = threading.Event()
+
+    def reset(self, state):
+        self.results.clear()
+        self.footprints.clear()
+        self.dirty = set(state.available_moves())
+
+    def note_move(self, state, move):
+        """
+        Invalidate the evaluations affected by `move` (call after it is drawn on `state`).
+        """
+        self.results.pop(move, None)
+        self.footprints.pop(move, None)
+        self.dirty.discard(move)
+        changed = set(state._adjacent_boxes(*move))
+        # A new capturable box is grabbed by every chain rollout, wherever it starts
+        new_capturable = any(self._sides(state, r, c) == 3 for r, c in changed)
+        for edge, footprint in self.footprints.items():
+            if footprint & changed or (new_capturable and self.results[edge][0] == GIVES):
+                self.dirty.add(edge)
+
+    def start(self, state, post):
+        """
+        Score the dirty lines of `state` on a background thread (stops any earlier run).
+        :param post: Called on that thread with (generation, {move: (result, footprint)}) after
+            every batch; it must hand them to the thread that owns the heatmap, which calls apply()
+        """
+        self._stop.set()
+        self._stop = threading.Event()
+        self.generation += 1
+        if self.dirty:
+            threading.Thread(
+                target=self._run, args=(state.copy_state(), list(self.dirty), self._stop, self.generation, post),
+                name="heatmap", daemon=True,
+            ).start()
+
+    def stop(self):
+        # Does not wait: the thread sees the event after the line it is scoring
+        self._stop.set()
+
+    def apply(self, generation, evaluated):
+        """
+        Store a batch posted by the background thread.
+        :return: True if every line is scored
+        """
+        if generation != self.generation:
+            return False  # Scored on a board that has changed since
+        for move, (result, footprint) in evaluated.items():
+            if move in self.dirty:
+                self.dirty.discard(move)
+                self.results[move], self.footprints[move] = result, footprint
+        return not self.dirty
+
+    def _run(self, state, moves, stop, generation, post):
+        for start in range(0, len(moves), BATCH):
+            evaluated = {}
+            for move in moves[start:start + BATCH]:
+                if stop.is_set():
+                    return
+                evaluated[move] = self.evaluate(state, move)
+            if stop.is_set():
+                return
+            post(generation, evaluated)
+
+    def evaluate(self, state, move):
+        adjacent = set(state._adjacent_boxes(*move))
+        taken = state._count_new_boxes(*move, player=state.current_player)
+        if taken:
+            return (TAKES, taken), adjacent
+        if not state.move_makes_third_side(move):
+            return (SAFE, 0), adjacent
+        test = state.copy_state()
+        test.make_move(*move)
+        given = test._simulate_opponent_chain()
+        footprint = set(adjacent)
+        for r, c, is_h in state.available_moves():
+            if (test.h_lines if is_h else test.v_lines)[r][c] and (r, c, is_h) != move:
+                # A line the rollout drew: the boxes it touched and their neighbours decide where the chain stops
+                for rr, cc in state._adjacent_boxes(r, c, is_h):
+                    footprint.update(((rr, cc), (rr - 1, cc), (rr + 1, cc), (rr, cc - 1), (rr, cc + 1)))
+        return (GIVES, given), footprint
+
+    def _sides(self, state, r, c):
+        return state.h_lines[r][c] + state.h_lines[r + 1][c] + state.v_lines[r][c] + state.v_lines[r][c + 1]
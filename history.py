@@ -0,0 +1,248 @@
+"""
+SQLite-backed game history and statistics.
+
+Finished games (and optionally their moves, with replay keyframes) are queued
+and written by a background thread, many games per transaction. Statistics are
+computed with aggregate queries over indexed columns, so the stats view stays
+instant with tens of thousands of human and self-play games on record.
+"""
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+
+from replay import build_keyframes
+
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), "game_history.db")
+BATCH_SIZE = 500  # Games per write transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    player TEXT NOT NULL,
+    opponent TEXT NOT NULL,
+    grid_size INTEGER NOT NULL,
+    player_score INTEGER NOT NULL,
+    opponent_score INTEGER NOT NULL,
+    margin INTEGER NOT NULL,
+    result INTEGER NOT NULL,  -- 1 win, 0 tie, -1 loss (for `player`)
+    source TEXT NOT NULL DEFAULT 'human'
+);
+CREATE INDEX IF NOT EXISTS games_player_grid ON games (player, grid_size, result, margin);
+CREATE INDEX IF NOT EXISTS games_player_date ON games (player, played_at, result);
+CREATE INDEX IF NOT EXISTS games_grid ON games (grid_size);
+CREATE INDEX IF NOT EXISTS games_date ON games (played_at);
+CREATE TABLE IF NOT EXISTS moves (
+    game_id INTEGER NOT NULL REFERENCES games (id),
+    ply INTEGER NOT NULL,
+    r INTEGER NOT NULL,
+    c INTEGER NOT NULL,
+    is_h INTEGER NOT NULL,
+    player INTEGER NOT NULL,
+    PRIMARY KEY (game_id, ply)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS keyframes (
+    game_id INTEGER NOT NULL REFERENCES games (id),
+    ply INTEGER NOT NULL,
+    snapshot TEXT NOT NULL,  -- JSON board snapshot after `ply` moves (see replay.snapshot)
+    PRIMARY KEY (game_id, ply)
+) WITHOUT ROWID;
+"""
+
+_STOP = object()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers (the stats view) never wait for the writer
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_FILE):
+        """
+        Game history database with a background writer thread (started on first write).
+        :param path: SQLite file
+        :raises sqlite3.Error: If the database cannot be opened or created (read-only, locked, corrupt)
+        """
+        self.path = path
+        self._queue = queue.Queue()
+        self._writer = None
+        self._read_conn = None
+        conn = _connect(path)
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    # --- Writing ---
+
+    def record_game(self, player, opponent, grid_size, scores, moves=None, source="human", played_at=None):
+        """
+        Queue a finished game for writing.
+        :param scores: [player score, opponent score]
+        :param moves: Optional list of (r, c, is_h, player) in play order
+        """
+        margin = scores[0] - scores[1]
+        game = (
+            played_at if played_at is not None else time.time(), player, opponent, grid_size,
+            scores[0], scores[1], margin, (margin > 0) - (margin < 0), source,
+        )
+        self._put(("game", game, moves))
+
+    def save_keyframes(self, game_id, keyframes):
+        """
+        Queue replay keyframes for a recorded game (e.g. one recorded before keyframes were stored).
+        :param keyframes: {ply: snapshot} as built by replay.build_keyframes
+        """
+        self._put(("keyframes", game_id, keyframes))
+
+    def _put(self, item):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+            self._writer.start()
+        self._queue.put(item)
+
+    def flush(self):
+        # Block until every queued game is committed
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+        if self._read_conn is not None:
+            self._read_conn.close()
+            self._read_conn = None
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            items = [item for item in batch if item is not _STOP]
+            try:
+                with conn:
+                    for kind, *args in items:
+                        if kind == "game":
+                            self._insert_game(conn, *args)
+                        else:
+                            self._insert_keyframes(conn, *args)
+            except sqlite3.Error:
+                pass  # History is best effort, like the JSON config
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                conn.close()
+                return
+
+    def _insert_game(self, conn, game, moves):
+        cursor = conn.execute(
+            "INSERT INTO games (played_at, player, opponent, grid_size, player_score, "
+            "opponent_score, margin, result, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", game
+        )
+        if moves:
+            game_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO moves (game_id, ply, r, c, is_h, player) VALUES (?, ?, ?, ?, ?, ?)",
+                [(game_id, ply, r, c, int(is_h), p) for ply, (r, c, is_h, p) in enumerate(moves)]
+            )
+            self._insert_keyframes(conn, game_id, build_keyframes(game[3], moves))
+
+    def _insert_keyframes(self, conn, game_id, keyframes):
+        conn.executemany(
+            "INSERT OR IGNORE INTO keyframes (game_id, ply, snapshot) VALUES (?, ?, ?)",
+            [(game_id, ply, json.dumps(snap, separators=(",", ":"))) for ply, snap in keyframes.items()]
+        )
+
+    # --- Statistics ---
+
+    def _reader(self):
+        if self._read_conn is None:
+            self._read_conn = _connect(self.path)
+        return self._read_conn
+
+    def stats_by_grid_size(self, player):
+        """
+        Per grid size: (grid_size, games, wins, losses, ties, win rate, average margin).
+        """
+        rows = self._reader().execute(
+            "SELECT grid_size, COUNT(*), SUM(result = 1), SUM(result = -1), SUM(result = 0), AVG(margin) "
+            "FROM games WHERE player = ? GROUP BY grid_size ORDER BY grid_size", (player,)
+        ).fetchall()
+        return [
+            (grid_size, games, wins, losses, ties, wins / games if games else 0.0, avg_margin or 0.0)
+            for grid_size, games, wins, losses, ties, avg_margin in rows
+        ]
+
+    def streaks(self, player):
+        """
+        :return: (current streak length, its result (1/0/-1 or None), longest win streak)
+        """
+        rows = self._reader().execute(
+            """
+            WITH ordered AS (
+                SELECT result,
+                       ROW_NUMBER() OVER (ORDER BY played_at, id) AS n,
+                       ROW_NUMBER() OVER (PARTITION BY result ORDER BY played_at, id) AS n_result
+                FROM games WHERE player = ?
+            )
+            SELECT result, COUNT(*), MAX(n) FROM ordered GROUP BY result, n - n_result
+            """, (player,)
+        ).fetchall()
+        if not rows:
+            return 0, None, 0
+        current = max(rows, key=lambda row: row[2])
+        longest_win = max((length for result, length, _ in rows if result == 1), default=0)
+        return current[1], current[0], longest_win
+
+    def recent_games(self, limit=200):
+        """
+        Most recent games that have recorded moves (newest first).
+        :return: List of dicts with id, played_at, player, opponent, grid_size and scores
+        """
+        rows = self._reader().execute(
+            "SELECT id, played_at, player, opponent, grid_size, player_score, opponent_score FROM games "
+            "WHERE EXISTS (SELECT 1 FROM moves WHERE moves.game_id = games.id) ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [self._game_dict(row) for row in rows]
+
+    def game(self, game_id):
+        row = self._reader().execute(
+            "SELECT id, played_at, player, opponent, grid_size, player_score, opponent_score FROM games WHERE id = ?",
+            (game_id,)
+        ).fetchone()
+        return self._game_dict(row) if row else None
+
+    def _game_dict(self, row):
+        game_id, played_at, player, opponent, grid_size, player_score, opponent_score = row
+        return {
+            "id": game_id, "played_at": played_at, "player": player, "opponent": opponent,
+            "grid_size": grid_size, "scores": [player_score, opponent_score],
+        }
+
+    def keyframes_of(self, game_id):
+        return {
+            ply: json.loads(snap) for ply, snap in self._reader().execute(
+                "SELECT ply, snapshot FROM keyframes WHERE game_id = ?", (game_id,)
+            )
+        }
+
+    def moves_of(self, game_id):
+        return [
+            (r, c, bool(is_h), p) for r, c, is_h, p in self._reader().execute(
+                "SELECT r, c, is_h, player FROM moves WHERE game_id = ? ORDER BY ply", (game_id,)
+            )
+        ]
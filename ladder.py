@@ -0,0 +1,332 @@
+"""
+AI rating ladder: computer player strategies against each other, stopped by SPRT.
+
+A strategy is a sequence of computer player stages (see board_state.STRATEGY_STAGES)
+or a difficulty level (difficulty.LEVELS, searched under its compute budget).
+A match plays pairs of games on a process pool: both games of a pair start from the
+same random opening, with the strategies swapping sides, so a lucky opening counts
+for both. Elo and BayesElo estimates are updated after every game, and the match
+stops as soon as a sequential probability ratio test accepts either hypothesis
+(H0: the first strategy is no stronger than elo0, H1: it is at least elo1 BayesElo
+stronger), instead of after a fixed number of games.
+
+Usage:
+    python ladder.py --grid-size 5 full no_nimstring heuristic
+    python ladder.py --grid-size 5 full capture,safe,min_chain --elo0 0 --elo1 50
+    python ladder.py --grid-size 5 easy medium hard expert
+"""
+import sys
+import math
+import random
+import argparse
+from itertools import combinations
+from multiprocessing import Pool
+
+from board_state import BoardState, GRID_SIZE, STRATEGY_STAGES, DEFAULT_STRATEGY
+from difficulty import LEVELS, Budget, choose_move
+
+STRATEGIES = {
+    "full": DEFAULT_STRATEGY,
+    "no_tablebase": tuple(stage for stage in DEFAULT_STRATEGY if stage != "perfect"),
+    "no_nimstring": tuple(stage for stage in DEFAULT_STRATEGY if stage != "nimstring"),
+    # The original computer player's stages. Its chain rollouts have since been fixed to count
+    # the boxes handed over, so it is stronger than the first release's player.
+    "heuristic": ("capture", "safe", "min_chain"),
+    "greedy": ("capture", "random"),
+    "random": ("random",),
+}
+OPENING_PLIES = 4  # Random safe moves played before the strategies take over
+
+
+def parse_strategy(name):
+    """
+    A STRATEGIES name, a difficulty level (returned as its Budget), or stage names separated by commas
+    (e.g. "capture,safe,min_chain").
+    """
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    if name.capitalize() in LEVELS:
+        return LEVELS[name.capitalize()]
+    stages = tuple(stage.strip() for stage in name.split(",") if stage.strip())
+    unknown = [stage for stage in stages if stage not in STRATEGY_STAGES]
+    if not stages or unknown:
+        raise ValueError(f"Unknown strategy {name!r}: use one of {', '.join(STRATEGIES)}, a difficulty level "
+                         f"or comma-separated stages from {', '.join(STRATEGY_STAGES)}")
+    return stages
+
+
+def random_opening(grid_size, plies, rng):
+    """
+    Random moves that draw no third side of a box, alternating players.
+    """
+    state = BoardState(grid_size)
+    opening = []
+    for _ in range(plies):
+        safe = [move for move in state.available_moves() if not state.move_makes_third_side(move)]
+        if not safe:
+            break
+        move = rng.choice(safe)
+        state.make_move(*move)
+        opening.append(move)
+    return opening
+
+
+def play_game(grid_size, strategies, opening, seed):
+    """
+    Play one game from an opening.
+    :param strategies: Pair of strategies indexed by player number; player 0 moves first
+    :return: Final scores
+    """
+    random.seed(seed)
+    state = BoardState(grid_size)
+    for move in opening:
+        state.make_move(*move)
+        state.current_player = 1 - state.current_player
+    while not state.game_over:
+        player = state.current_player
+        strategy = strategies[player]
+        if isinstance(strategy, Budget):
+            move = choose_move(state, strategy)
+        else:
+            move = state.choose_computer_move(strategy)
+        state.make_move(*move)
+        if not state.check_and_update_boxes():
+            state.current_player = 1 - player
+    return state.scores
+
+
+def _score(scores, player):
+    margin = scores[player] - scores[1 - player]
+    return 1.0 if margin > 0 else 0.0 if margin < 0 else 0.5
+
+
+def play_pair(task):
+    """
+    Both colour assignments from one opening.
+    :return: Results (1 / 0.5 / 0) of strategy A in its two games
+    """
+    pair_index, grid_size, strategy_a, strategy_b, seed, opening_plies = task
+    pair_seed = seed * 1_000_003 + pair_index
+    opening = random_opening(grid_size, opening_plies, random.Random(pair_seed))
+    first = play_game(grid_size, (strategy_a, strategy_b), opening, 2 * pair_seed)
+    second = play_game(grid_size, (strategy_b, strategy_a), opening, 2 * pair_seed + 1)
+    return _score(first, 0), _score(second, 1)
+
+
+# --- Ratings ---
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def bayes_elo(wins, draws, losses):
+    """
+    BayesElo difference and draw Elo from W/D/L counts (half a win and half a loss are
+    added so one-sided early results stay finite).
+    """
+    total = wins + draws + losses + 1
+    w = (wins + 0.5) / total
+    l = (losses + 0.5) / total
+    elo = 200 * math.log10(w / l * (1 - l) / (1 - w))
+    draw_elo = 200 * math.log10((1 - l) / l * (1 - w) / w)
+    return elo, draw_elo
+
+
+def _bayes_probabilities(elo, draw_elo):
+    p_win = 1 / (1 + 10 ** ((-elo + draw_elo) / 400))
+    p_loss = 1 / (1 + 10 ** ((elo + draw_elo) / 400))
+    return p_win, 1 - p_win - p_loss, p_loss
+
+
+class SPRT:
+    def __init__(self, elo0=0.0, elo1=50.0, alpha=0.05, beta=0.05):
+        """
+        Sequential probability ratio test on the trinomial (win/draw/loss) BayesElo model.
+        :param elo0: H0 BayesElo difference (A is no stronger than this)
+        :param elo1: H1 BayesElo difference (A is at least this much stronger)
+        :param alpha: False positive rate (accepting H1 when H0 holds)
+        :param beta: False negative rate
+        """
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.wins = self.draws = self.losses = 0
+
+    def add(self, result):
+        if result == 1.0:
+            self.wins += 1
+        elif result == 0.0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def llr(self):
+        if not self.games:
+            return 0.0
+        _, draw_elo = bayes_elo(self.wins, self.draws, self.losses)
+        p0 = _bayes_probabilities(self.elo0, draw_elo)
+        p1 = _bayes_probabilities(self.elo1, draw_elo)
+        counts = (self.wins, self.draws, self.losses)
+        return sum(n * math.log(b / a) for n, a, b in zip(counts, p0, p1) if n)
+
+    def decision(self):
+        """
+        :return: "H1", "H0" or None while the test is still running
+        """
+        llr = self.llr()
+        if llr >= self.upper:
+            return "H1"
+        if llr <= self.lower:
+            return "H0"
+        return None
+
+
+class MatchResult:
+    def __init__(self, name_a, name_b, sprt):
+        self.name_a = name_a
+        self.name_b = name_b
+        self.sprt = sprt
+        self.pairs = 0
+        self.total = 0.0  # Points of A
+        self.total_sq = 0.0
+        self.decision = None
+
+    def add_pair(self, results):
+        self.pairs += 1
+        for result in results:
+            self.sprt.add(result)
+            self.total += result
+            self.total_sq += result * result
+        if self.decision is None:
+            self.decision = self.sprt.decision()
+
+    @property
+    def score(self):
+        return self.total / self.sprt.games if self.sprt.games else 0.5
+
+    def elo(self):
+        """
+        :return: (Elo of A over B, 95% error margin; inf when it cannot be estimated)
+        """
+        games = self.sprt.games
+        score = self.score
+        stdev = math.sqrt(max(self.total_sq / games - score * score, 0.0) / games) if games else 0.0
+        if games < 2 or stdev == 0:
+            # Too few games, or identical results (e.g. one side won them all): no spread to measure
+            return elo_from_score(score), float("inf")
+        low, high = elo_from_score(score - 1.96 * stdev), elo_from_score(score + 1.96 * stdev)
+        return elo_from_score(score), (high - low) / 2
+
+    def summary(self):
+        sprt = self.sprt
+        elo, margin = self.elo()
+        margin = f"{margin:.1f}" if math.isfinite(margin) else "n/a"
+        bayes, _ = bayes_elo(sprt.wins, sprt.draws, sprt.losses) if sprt.games else (0.0, 0.0)
+        verdict = {"H1": "A stronger", "H0": "A not stronger", None: "inconclusive"}[self.decision]
+        return (f"{self.name_a} vs {self.name_b}: +{sprt.wins} ={sprt.draws} -{sprt.losses} "
+                f"({sprt.games} games) Elo {elo:+.1f} +/- {margin}, BayesElo {bayes:+.1f}, "
+                f"LLR {sprt.llr():.2f} [{sprt.lower:.2f}, {sprt.upper:.2f}] -> {verdict}")
+
+
+def match(name_a, name_b, grid_size=GRID_SIZE, max_pairs=5000, elo0=0.0, elo1=50.0, alpha=0.05, beta=0.05,
+          workers=None, seed=0, opening_plies=OPENING_PLIES, progress=True):
+    """
+    Play strategy A against strategy B until the SPRT decides or max_pairs pairs are played.
+    :return: MatchResult
+    """
+    strategy_a, strategy_b = parse_strategy(name_a), parse_strategy(name_b)
+    result = MatchResult(name_a, name_b, SPRT(elo0, elo1, alpha, beta))
+    tasks = ((i, grid_size, strategy_a, strategy_b, seed, opening_plies) for i in range(max_pairs))
+    pool = Pool(workers)
+    try:
+        # Results arrive as pairs finish; games still in flight when the test stops are discarded
+        for pair in pool.imap_unordered(play_pair, tasks):
+            result.add_pair(pair)
+            if progress and result.pairs % 10 == 0:
+                print(f"  {result.summary()}", file=sys.stderr)
+            if result.decision is not None:
+                break
+    finally:
+        pool.terminate()  # Drop the games still queued or in flight
+        pool.join()
+    return result
+
+
+def fit_ratings(names, results, iterations=200):
+    """
+    Bradley-Terry ratings from every match's points, anchored at 0 for the first strategy.
+    :param results: MatchResult list
+    :return: {name: Elo}
+    """
+    strength = {name: 1.0 for name in names}
+    points = {name: 0.0 for name in names}
+    games = {}
+    for result in results:
+        n = result.sprt.games
+        points[result.name_a] += result.total
+        points[result.name_b] += n - result.total
+        games[(result.name_a, result.name_b)] = games.get((result.name_a, result.name_b), 0) + n
+    for _ in range(iterations):
+        # Minorization-maximization update, plus one virtual draw against a strength-1 player
+        # so unbeaten (or winless) strategies keep a finite rating
+        for name in names:
+            denominator = sum(
+                n / (strength[a] + strength[b]) for (a, b), n in games.items() if name in (a, b)
+            )
+            strength[name] = (points[name] + 0.5) / (denominator + 1 / (strength[name] + 1))
+    anchor = strength[names[0]]
+    return {name: 400 * math.log10(strength[name] / anchor) for name in names}
+
+
+def ladder(names, grid_size=GRID_SIZE, workers=None, **match_options):
+    """
+    Round robin of SPRT matches between every pair of strategies.
+    :return: ({name: Elo}, MatchResult list)
+    """
+    results = []
+    for name_a, name_b in combinations(names, 2):
+        result = match(name_a, name_b, grid_size, workers=workers, **match_options)
+        print(result.summary(), file=sys.stderr)
+        results.append(result)
+    return fit_ratings(list(names), results), results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rate Dots and Boxes computer strategies against each other.")
+    parser.add_argument("strategies", nargs="+",
+                        help=f"Two or more of {', '.join(STRATEGIES)}, difficulty levels ({', '.join(LEVELS)}) "
+                             "or comma-separated stages")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE, help="Number of dots per side (3-10)")
+    parser.add_argument("--max-pairs", type=int, default=5000, help="Game pairs per match if the SPRT never decides")
+    parser.add_argument("--elo0", type=float, default=0.0, help="SPRT H0 bound (BayesElo)")
+    parser.add_argument("--elo1", type=float, default=50.0, help="SPRT H1 bound (BayesElo)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="SPRT false positive rate")
+    parser.add_argument("--beta", type=float, default=0.05, help="SPRT false negative rate")
+    parser.add_argument("--opening-plies", type=int, default=OPENING_PLIES, help="Random safe moves per opening")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="Base random seed")
+    args = parser.parse_args(argv)
+    if len(args.strategies) < 2:
+        parser.error("need at least two strategies")
+    for name in args.strategies:
+        try:
+            parse_strategy(name)
+        except ValueError as e:
+            parser.error(str(e))
+    ratings, _ = ladder(
+        args.strategies, args.grid_size, args.workers, max_pairs=args.max_pairs, elo0=args.elo0, elo1=args.elo1,
+        alpha=args.alpha, beta=args.beta, seed=args.seed, opening_plies=args.opening_plies,
+    )
+    print(f"{'Strategy':<40} {'Elo':>8}")
+    for name, elo in sorted(ratings.items(), key=lambda item: -item[1]):
+        print(f"{name:<40} {elo:>+8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Pondering: think about the computer's reply while the human is choosing a move.
+
+A background thread walks the human's likely replies (safe moves first), plays
+each on a copy of the board and searches the computer's answer, storing the
+search's progress (best move so far and the search limits it reached) keyed by
+the resulting position_key, even when the search is cut short. When the
+human's move arrives the computer's search resumes from that progress instead
+of starting cold, and a finished search is played at once; positions that were
+not reached still leave the AI's own caches (endgame memo, nimber table)
+warmer than a cold start.
+"""
+import threading
+
+from difficulty import AnytimeSearch
+
+JOIN_TIMEOUT = 0.2  # Seconds to wait for the pondering thread to notice a cancel (it checks every few ms)
+
+
+class Ponderer:
+    def __init__(self):
+        self.results = {}  # position_key -> AnytimeSearch.progress() of the computer's reply
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, state, budget):
+        """
+        Start pondering on the human's turn in `state` (restarts any earlier run).
+        :param budget: difficulty.Budget the computer plays with (each pondered reply gets the same)
+        """
+        self._stop.set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(state.copy_state(), self._stop, budget), name="ponder", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        # Stop searching but keep what was found, so the next computer move can use it.
+        # Does not wait: the running search sees the event within a few milliseconds.
+        self._stop.set()
+
+    def cancel(self):
+        # New game or window close: stop, wait for the thread and forget everything
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(JOIN_TIMEOUT)
+        self._thread = None
+        with self._lock:
+            self.results.clear()
+
+    def take(self, state):
+        """
+        Return the pondered search progress for the current position (or None) and drop the rest.
+        Pass it as `resume` to difficulty.choose_move.
+        """
+        with self._lock:
+            progress = self.results.get(state.position_key)
+            self.results.clear()
+        return progress if progress is not None and progress[0] in state.available_moves() else None
+
+    def _likely_replies(self, state):
+        moves = state.available_moves()
+        safe = [move for move in moves if not state.move_makes_third_side(move)]
+        return safe + [move for move in moves if move not in safe]
+
+    def _run(self, state, stop, budget):
+        for move in self._likely_replies(state):
+            if stop.is_set():
+                return
+            child = state.copy_state()
+            child.make_move(*move)
+            if child.check_and_update_boxes() or child.game_over:
+                continue  # The human moves again (or the game ends): nothing for the computer to answer
+            child.current_player = 1
+            key = child.position_key
+            with self._lock:
+                if key in self.results:
+                    continue
+            search = AnytimeSearch(child, budget, stop=stop)
+            search.run()
+            with self._lock:
+                self.results[key] = search.progress()  # Kept when cut short: the real search resumes from it
+            if stop.is_set():
+                return
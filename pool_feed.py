@@ -0,0 +1,40 @@
+"""
+Backpressure for process pool inputs.
+
+Pool.imap and imap_unordered pull their input on a background thread as fast as
+they can, so a large or endless task generator would be read far ahead of the
+workers. BoundedFeed holds that thread back: only a few tasks per worker are
+handed out until the consumer reports results with done(), and close() lets a
+consumer that stops early shut the pool down without the feeder hanging.
+"""
+import os
+import threading
+
+TASKS_PER_WORKER = 4  # Tasks in flight per worker process
+
+
+class BoundedFeed:
+    def __init__(self, tasks, workers=None):
+        """
+        :param tasks: Iterable of pool tasks (read lazily)
+        :param workers: Pool size (default: all cores)
+        """
+        self.tasks = tasks
+        self._slots = threading.Semaphore(TASKS_PER_WORKER * (workers or os.cpu_count() or 1))
+        self._stop = threading.Event()
+
+    def __iter__(self):
+        for task in self.tasks:
+            self._slots.acquire()
+            if self._stop.is_set():
+                return
+            yield task
+
+    def done(self):
+        # One result consumed: the feeder may hand out another task
+        self._slots.release()
+
+    def close(self):
+        # Stop feeding; wakes the feeder if it is waiting so the pool can shut down
+        self._stop.set()
+        self._slots.release()
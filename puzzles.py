@@ -0,0 +1,259 @@
+"""
+Puzzle miner: instructive endgames from self-play data.
+
+Self-play positions (selfplay.py shards) are streamed through the exact endgame
+solver on a process pool. A position becomes a puzzle when the player to move
+has exactly one winning move, e.g. declining the last boxes of a chain
+(double-dealing) or sacrificing boxes to keep control. Puzzles are deduplicated
+by a canonical position key (the same under all 8 board symmetries) and written
+to a puzzle pack: one JSON line per puzzle plus an index of line offsets, so the
+GUI loads single puzzles on demand.
+
+Only batches of candidate positions are ever in flight (at most a few per
+worker), so memory stays flat however large the self-play run is.
+
+Usage:
+    python puzzles.py --data selfplay_data --out puzzles.jsonl
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from array import array
+from multiprocessing import Pool
+
+from board_state import zobrist_table
+from pool_feed import BoundedFeed
+from evaluation import state_from_record
+from selfplay import read_records
+from tablebase import ENDGAME_EDGES, edge_list, board_mask, move_values, endgame_solver
+
+PUZZLE_FILE = os.path.join(os.path.dirname(__file__), "puzzles.jsonl")
+THEMES = ("decline", "sacrifice", "quiet", "capture")
+DEFAULT_THEMES = ("decline", "sacrifice", "quiet")  # A lone winning capture is rarely instructive
+MIN_FREE_LINES = 3  # Fewer free lines leave nothing to think about
+
+
+def index_path(pack_path):
+    return os.path.splitext(pack_path)[0] + ".idx"
+
+
+# --- Canonical keys ---
+
+_symmetric_keys = {}
+
+
+def _symmetry_keys(grid_size):
+    """
+    For each of the 8 board symmetries, the Zobrist key of every edge (edge_list order) after the transform.
+    """
+    keys = _symmetric_keys.get(grid_size)
+    if keys is None:
+        n = grid_size
+        table = zobrist_table(n)
+        m = n - 1
+        transforms = [
+            lambda y, x: (y, x), lambda y, x: (y, m - x), lambda y, x: (m - y, x), lambda y, x: (m - y, m - x),
+            lambda y, x: (x, y), lambda y, x: (x, m - y), lambda y, x: (m - x, y), lambda y, x: (m - x, m - y),
+        ]
+        keys = []
+        for transform in transforms:
+            edge_keys = []
+            for r, c, is_h in edge_list(n):
+                (y1, x1), (y2, x2) = transform(r, c), transform(r, c + 1) if is_h else transform(r + 1, c)
+                if y1 == y2:
+                    edge_keys.append(table["h"][y1][min(x1, x2)])
+                else:
+                    edge_keys.append(table["v"][min(y1, y2)][x1])
+            keys.append(edge_keys)
+        _symmetric_keys[grid_size] = keys
+    return keys
+
+
+def canonical_key(state, mask=None):
+    """
+    Position key that is identical for all 8 reflections/rotations of a board.
+    Box owners do not matter, only the score difference for the player to move.
+    """
+    table = zobrist_table(state.grid_size)
+    mask = board_mask(state) if mask is None else mask
+    drawn = [i for i in range(mask.bit_length()) if mask >> i & 1]
+    best = None
+    for edge_keys in _symmetry_keys(state.grid_size):
+        key = 0
+        for i in drawn:
+            key ^= edge_keys[i]
+        if best is None or key < best:
+            best = key
+    player = state.current_player
+    return best ^ table["score_diff"][state.scores[player] - state.scores[1 - player] + table["diff_offset"]]
+
+
+# --- Mining ---
+
+def classify(state, mask=None):
+    """
+    Solve a position exactly and return it as a puzzle dict if it has a unique winning move.
+    :return: Puzzle dict or None
+    """
+    n = state.grid_size
+    mask = board_mask(state) if mask is None else mask
+    solver = endgame_solver(n)
+    player = state.current_player
+    diff = state.scores[player] - state.scores[1 - player]
+    values = list(move_values(mask, solver.num_edges, solver.masks, solver.value))
+    if len(values) < 2:
+        return None
+    winning = [(e, gain, value) for e, gain, value in values if diff + value > 0]
+    if len(winning) != 1:
+        return None
+    e, gain, value = winning[0]
+    move = edge_list(n)[e]
+    if gain:
+        theme = "capture"
+    elif any(other_gain for _, other_gain, _ in values):
+        theme = "decline"  # Boxes were there for the taking, but the only win leaves them
+    elif state.move_makes_third_side(move):
+        theme = "sacrifice"
+    else:
+        theme = "quiet"
+    return {
+        "grid_size": n,
+        "h_lines": "".join("1" if drawn else "0" for row in state.h_lines for drawn in row),
+        "v_lines": "".join("1" if drawn else "0" for row in state.v_lines for drawn in row),
+        "scores": state.scores[:],
+        "to_move": player,
+        "solution": list(move),
+        "margin": diff + value,  # Final margin for the player to move with best play
+        "theme": theme,
+        "key": f"{canonical_key(state, mask):016x}",
+    }
+
+
+def _mine_batch(records):
+    puzzles = []
+    for record in records:
+        puzzle = classify(state_from_record(record))
+        if puzzle is not None:
+            puzzles.append(puzzle)
+    return len(records), puzzles
+
+
+def candidate_batches(data_dir, batch_size, max_free, counter):
+    # Cheap pre-filter in the reader: only positions the exact solver can finish go to the pool
+    batch = []
+    for record in read_records(data_dir):
+        counter[0] += 1
+        free = record["h_lines"].count("0") + record["v_lines"].count("0")
+        if MIN_FREE_LINES <= free <= max_free:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def mine(data_dir, out_path=PUZZLE_FILE, themes=DEFAULT_THEMES, max_free=ENDGAME_EDGES, workers=None,
+         batch_size=256, limit=None):
+    """
+    Stream a self-play run through the solver and write a puzzle pack.
+    :param themes: Puzzle themes to keep (see THEMES)
+    :param max_free: Positions with more free lines than this are skipped
+    :param limit: Stop after this many puzzles
+    :return: Number of puzzles written
+    """
+    workers = workers or os.cpu_count() or 1
+    scanned = [0]
+    solved = 0
+    seen = set()  # Canonical keys of the puzzles written so far
+    offsets = array("Q")
+    start = time.perf_counter()
+    batches = BoundedFeed(candidate_batches(data_dir, batch_size, max_free, scanned), workers)
+    with open(out_path, "wb") as out, Pool(workers) as pool:
+        for done, (count, puzzles) in enumerate(pool.imap_unordered(_mine_batch, batches), start=1):
+            batches.done()
+            solved += count
+            for puzzle in puzzles:
+                if puzzle["theme"] not in themes or puzzle["key"] in seen:
+                    continue
+                seen.add(puzzle["key"])
+                offsets.append(out.tell())
+                out.write(json.dumps(puzzle, separators=(",", ":")).encode("utf-8") + b"\n")
+                if limit and len(offsets) >= limit:
+                    break
+            if limit and len(offsets) >= limit:
+                batches.close()
+                break
+            if done % 100 == 0:
+                rate = scanned[0] / max(time.perf_counter() - start, 1e-9) * 3600
+                print(f"{scanned[0]} positions read, {solved} solved, {len(offsets)} puzzles "
+                      f"({rate:,.0f} positions/hour)", file=sys.stderr)
+    with open(index_path(out_path), "wb") as f:
+        offsets.tofile(f)
+    return len(offsets)
+
+
+# --- Reading ---
+
+class PuzzlePack:
+    def __init__(self, path=PUZZLE_FILE):
+        """
+        Lazily loaded puzzle pack: only the offset index is read up front.
+        """
+        self.path = path
+        self.offsets = array("Q")
+        with open(index_path(path), "rb") as f:
+            self.offsets.frombytes(f.read())
+        self._file = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if self._file is None:
+            self._file = open(self.path, "rb")
+        self._file.seek(self.offsets[index])
+        return json.loads(self._file.readline())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def puzzle_state(puzzle):
+    """
+    BoardState of a puzzle (claimed boxes get owners in reading order to match the scores).
+    """
+    state = state_from_record(puzzle)
+    remaining = list(puzzle["scores"])
+    for row in state.boxes:
+        for c, owner in enumerate(row):
+            if owner is not None:
+                row[c] = 0 if remaining[0] else 1
+                remaining[row[c]] -= 1
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mine Dots and Boxes puzzles from self-play data.")
+    parser.add_argument("--data", default="selfplay_data", help="Self-play output directory")
+    parser.add_argument("--out", default=PUZZLE_FILE, help="Puzzle pack file (an .idx index is written next to it)")
+    parser.add_argument("--themes", default=",".join(DEFAULT_THEMES), help=f"Comma-separated from {', '.join(THEMES)}")
+    parser.add_argument("--max-free", type=int, default=ENDGAME_EDGES, help="Skip positions with more free lines")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Positions per worker task")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many puzzles")
+    args = parser.parse_args(argv)
+    themes = tuple(theme.strip() for theme in args.themes.split(",") if theme.strip())
+    unknown = [theme for theme in themes if theme not in THEMES]
+    if unknown:
+        parser.error(f"unknown themes: {', '.join(unknown)}")
+    count = mine(args.data, args.out, themes, args.max_free, args.workers, args.batch_size, args.limit)
+    print(f"{count} puzzles written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Seekable game replays.
+
+A recorded game is a list of (r, c, is_h, player) moves. Every KEYFRAME_INTERVAL
+plies a full snapshot of the board (lines, boxes, scores) is kept as a keyframe,
+so seeking to any ply restores the nearest earlier keyframe and replays fewer
+than KEYFRAME_INTERVAL moves; stepping forward from the current ply just plays
+the next moves. Keyframes are stored in the game history next to the moves.
+"""
+from bisect import bisect_right
+
+from board_state import BoardState
+
+KEYFRAME_INTERVAL = 16
+
+
+def _bits(lines):
+    return "".join("1" if drawn else "0" for row in lines for drawn in row)
+
+
+def snapshot(state):
+    """
+    Compact, JSON-friendly copy of a board position.
+    """
+    return {
+        "h": _bits(state.h_lines),
+        "v": _bits(state.v_lines),
+        "boxes": "".join("-" if owner is None else str(owner) for row in state.boxes for owner in row),
+        "scores": state.scores[:],
+        "player": state.current_player,
+    }
+
+
+def restore(grid_size, snap):
+    """
+    Build a BoardState from a snapshot (line keys included, so position_key is valid).
+    """
+    n = grid_size
+    state = BoardState(n)
+    h, v, boxes = snap["h"], snap["v"], snap["boxes"]
+    state.h_lines = [[h[r * (n - 1) + c] == "1" for c in range(n - 1)] for r in range(n)]
+    state.v_lines = [[v[r * n + c] == "1" for c in range(n)] for r in range(n - 1)]
+    state.boxes = [[None if boxes[r * (n - 1) + c] == "-" else int(boxes[r * (n - 1) + c]) for c in range(n - 1)]
+                   for r in range(n - 1)]
+    state.scores = list(snap["scores"])
+    state.current_player = snap["player"]
+    for r in range(n):
+        for c in range(n - 1):
+            if state.h_lines[r][c]:
+                state.lines_key ^= state.zobrist["h"][r][c]
+    for r in range(n - 1):
+        for c in range(n):
+            if state.v_lines[r][c]:
+                state.lines_key ^= state.zobrist["v"][r][c]
+    return state
+
+
+def apply_move(state, move):
+    # The player who draws the line claims the boxes it completes (only its neighbours can change)
+    r, c, is_h, player = move
+    state.current_player = player
+    state.make_move(r, c, is_h)
+    for rr, cc in state._adjacent_boxes(r, c, is_h):
+        if (
+            state.boxes[rr][cc] is None and
+            state.h_lines[rr][cc] and state.h_lines[rr + 1][cc] and
+            state.v_lines[rr][cc] and state.v_lines[rr][cc + 1]
+        ):
+            state.boxes[rr][cc] = player
+            state.scores[player] += 1
+
+
+def build_keyframes(grid_size, moves, interval=KEYFRAME_INTERVAL):
+    """
+    Play through a game once and snapshot every `interval` plies.
+    :return: {ply: snapshot}, always including ply 0
+    """
+    state = BoardState(grid_size)
+    keyframes = {0: snapshot(state)}
+    for ply, move in enumerate(moves, start=1):
+        apply_move(state, move)
+        if ply % interval == 0:
+            keyframes[ply] = snapshot(state)
+    return keyframes
+
+
+class GameReplay:
+    def __init__(self, grid_size, moves, keyframes=None):
+        """
+        :param moves: List of (r, c, is_h, player) in play order
+        :param keyframes: {ply: snapshot} as stored with the game (built here if missing)
+        """
+        self.grid_size = grid_size
+        self.moves = moves
+        self.keyframes = keyframes or build_keyframes(grid_size, moves)
+        self.keyframe_plies = sorted(self.keyframes)
+        self.ply = 0
+        self.state = restore(grid_size, self.keyframes[0])
+
+    def __len__(self):
+        return len(self.moves)
+
+    def seek(self, ply):
+        """
+        Move the replay to the position after `ply` moves.
+        :return: The replay's BoardState (shared; copy it before modifying)
+        """
+        ply = max(0, min(ply, len(self.moves)))
+        base = self.keyframe_plies[bisect_right(self.keyframe_plies, ply) - 1]
+        if not base <= self.ply <= ply:
+            # Going back (or far ahead): restart from the nearest keyframe instead
+            self.state = restore(self.grid_size, self.keyframes[base])
+            self.ply = base
+        for move in self.moves[self.ply:ply]:
+            apply_move(self.state, move)
+        self.ply = ply
+        if ply < len(self.moves):
+            self.state.current_player = self.moves[ply][3]
+        return self.state
+
+
+def load_replay(history, game_id):
+    """
+    GameReplay of a recorded game from the HistoryStore (None if its moves were not recorded).
+    Games recorded without keyframes get them built once and written back.
+    """
+    game = history.game(game_id)
+    moves = history.moves_of(game_id)
+    if game is None or not moves:
+        return None
+    keyframes = history.keyframes_of(game_id)
+    replay = GameReplay(game["grid_size"], moves, keyframes)
+    if not keyframes:
+        history.save_keyframes(game_id, replay.keyframes)
+    return replay
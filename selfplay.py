@@ -0,0 +1,198 @@
+"""
+Self-play dataset generator.
+
+Plays the computer player against itself (or against random moves) on a process
+pool and streams one record per move to sharded, gzip-compressed JSON-lines
+files. Games are played in fixed-size batches; each batch is appended to its
+shards as a complete gzip member and then committed to a checkpoint, so an
+interrupted run resumes exactly where the last batch ended and memory stays flat
+regardless of the number of games.
+
+Usage:
+    python selfplay.py --games 100000 --grid-size 5 --out selfplay_data
+"""
+import os
+import sys
+import json
+import gzip
+import random
+import argparse
+from multiprocessing import Pool
+
+from board_state import BoardState, GRID_SIZE
+from history import HistoryStore
+
+CHECKPOINT_NAME = "checkpoint.json"
+PLAYER_TYPES = ("computer", "random")
+
+
+def encode_lines(lines):
+    return "".join("1" if drawn else "0" for row in lines for drawn in row)
+
+
+def play_game(grid_size, players, seed):
+    """
+    Play one game and return its move records.
+    :param grid_size: Number of dots per side
+    :param players: Pair of player types from PLAYER_TYPES, indexed by player number
+    :param seed: Seed for every random choice made in the game
+    :return: List of dicts (position, move, final outcome from the mover's point of view)
+    """
+    random.seed(seed)
+    state = BoardState(grid_size)
+    state.current_player = seed % 2  # Alternate who opens
+    records = []
+    while not state.game_over:
+        player = state.current_player
+        if players[player] == "computer":
+            move = state.choose_computer_move()
+        else:
+            move = random.choice(state.available_moves())
+        records.append({
+            "grid_size": grid_size,
+            "h_lines": encode_lines(state.h_lines),
+            "v_lines": encode_lines(state.v_lines),
+            "scores": state.scores[:],
+            "to_move": player,
+            "key": f"{state.position_key:016x}",
+            "move": list(move),
+        })
+        state.make_move(*move)
+        if not state.check_and_update_boxes():
+            state.current_player = 1 - player
+    for record in records:
+        player = record["to_move"]
+        margin = state.scores[player] - state.scores[1 - player]
+        record["margin"] = margin
+        record["outcome"] = (margin > 0) - (margin < 0)
+    return records
+
+
+def _play_indexed(task):
+    game_index, grid_size, players, base_seed = task
+    return game_index, play_game(grid_size, players, base_seed * 1_000_003 + game_index)
+
+
+class ShardedWriter:
+    def __init__(self, out_dir, num_shards):
+        """
+        Append-only writer over num_shards gzip JSON-lines files plus a checkpoint.
+        :param out_dir: Output directory (created if needed)
+        :param num_shards: Number of shard files; game i goes to shard i % num_shards
+        """
+        self.out_dir = out_dir
+        self.num_shards = num_shards
+        os.makedirs(out_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(out_dir, CHECKPOINT_NAME)
+
+    def shard_path(self, shard):
+        return os.path.join(self.out_dir, f"shard-{shard:04d}.jsonl.gz")
+
+    def load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {"games_done": 0, "records": 0, "offsets": {}}
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def rollback(self, checkpoint):
+        # Drop anything appended after the last committed batch (e.g. a run killed mid-write)
+        for shard in range(self.num_shards):
+            path = self.shard_path(shard)
+            offset = checkpoint["offsets"].get(str(shard), 0)
+            if os.path.exists(path) and os.path.getsize(path) > offset:
+                with open(path, "r+b") as f:
+                    f.truncate(offset)
+
+    def append_batch(self, games, checkpoint):
+        """
+        Write one batch of (game_index, records) and commit the checkpoint.
+        """
+        by_shard = {}
+        for game_index, records in games:
+            by_shard.setdefault(game_index % self.num_shards, []).extend(records)
+        for shard, records in by_shard.items():
+            path = self.shard_path(shard)
+            with open(path, "ab") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+            checkpoint["offsets"][str(shard)] = os.path.getsize(path)
+            checkpoint["records"] += len(records)
+        checkpoint["games_done"] += len(games)
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+
+def read_records(out_dir):
+    """
+    Stream every record from the shards of a finished or partial run.
+    """
+    names = sorted(name for name in os.listdir(out_dir) if name.startswith("shard-"))
+    for name in names:
+        with gzip.open(os.path.join(out_dir, name), "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def _record_history(history, batch, grid_size, players):
+    total_boxes = (grid_size - 1) ** 2
+    for _, records in batch:
+        if not records:
+            continue
+        first = records[0]
+        mover = first["to_move"]
+        mover_score = (total_boxes + first["margin"]) // 2
+        scores = [mover_score, total_boxes - mover_score] if mover == 0 else [total_boxes - mover_score, mover_score]
+        moves = [(*record["move"], record["to_move"]) for record in records]
+        history.record_game(players[0], players[1], grid_size, scores, moves, source="selfplay")
+
+
+def generate(games, grid_size=GRID_SIZE, opponent="computer", out_dir="selfplay_data",
+             num_shards=16, batch_size=256, workers=None, seed=0, history_path=None):
+    """
+    Play `games` games in total (counting games already in the checkpoint).
+    :param opponent: Type of player 0; player 1 is always the computer
+    :param history_path: Also log finished games to this game history database
+    :return: Final checkpoint dict
+    """
+    history = HistoryStore(history_path) if history_path else None
+    writer = ShardedWriter(out_dir, num_shards)
+    checkpoint = writer.load_checkpoint()
+    writer.rollback(checkpoint)
+    players = (opponent, "computer")
+    with Pool(workers) as pool:
+        while checkpoint["games_done"] < games:
+            start = checkpoint["games_done"]
+            stop = min(games, start + batch_size)
+            tasks = [(i, grid_size, players, seed) for i in range(start, stop)]
+            batch = pool.map(_play_indexed, tasks, chunksize=max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1))))
+            writer.append_batch(batch, checkpoint)
+            if history is not None:
+                _record_history(history, batch, grid_size, players)
+            print(f"{checkpoint['games_done']}/{games} games, {checkpoint['records']} records", file=sys.stderr)
+    if history is not None:
+        history.close()
+    return checkpoint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate self-play training data for Dots and Boxes.")
+    parser.add_argument("--games", type=int, required=True, help="Total number of games (resumes if the output exists)")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE, help="Number of dots per side (3-10)")
+    parser.add_argument("--opponent", choices=PLAYER_TYPES, default="computer", help="Who plays against the computer")
+    parser.add_argument("--out", default="selfplay_data", help="Output directory")
+    parser.add_argument("--shards", type=int, default=16, help="Number of output shard files")
+    parser.add_argument("--batch-size", type=int, default=256, help="Games per checkpointed batch")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="Base random seed")
+    parser.add_argument("--history", default=None, help="Also record finished games in this SQLite history file")
+    args = parser.parse_args(argv)
+    generate(
+        args.games, args.grid_size, args.opponent, args.out,
+        args.shards, args.batch_size, args.workers, args.seed, args.history
+    )
+
+
+if __name__ == "__main__":
+    main()
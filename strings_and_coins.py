@@ -0,0 +1,241 @@
+"""
+Strings-and-Coins (Nimstring) evaluator for Dots and Boxes positions.
+
+Every unclaimed box is a coin and every undrawn line is a string tying a coin to
+its neighbour (or to the ground at the board edge). Drawing a line cuts a string.
+In Nimstring a player who captures a coin must move again, and the player who
+cannot complete a turn loses; winning Nimstring is winning the fight for control
+of the long chains in Dots and Boxes.
+
+Positions without capturable coins split into independent components whose
+nimbers combine with XOR. Component values are memoized under a canonical key
+(translation and the 8 board symmetries) in a JSON file next to this module.
+"""
+import os
+import json
+import random
+import threading
+
+LOONY = -1  # Value of a position that offers a double-dealing choice (a win for the player to move)
+MAX_COMPONENT_STRINGS = 16  # Components above this size are left to the heuristic player
+CACHE_FILE = os.path.join(os.path.dirname(__file__), "nimber_cache.json")
+
+_SYMMETRIES = [
+    lambda y, x: (y, x), lambda y, x: (y, -x), lambda y, x: (-y, x), lambda y, x: (-y, -x),
+    lambda y, x: (x, y), lambda y, x: (x, -y), lambda y, x: (-x, y), lambda y, x: (-x, -y),
+]
+
+
+def free_strings(board):
+    """
+    Return the undrawn lines of a board as a frozenset of (r, c, is_h) strings.
+    :param board: Any object with grid_size, h_lines and v_lines (e.g. DotsAndBoxesBoard)
+    """
+    strings = set()
+    for r, row in enumerate(board.h_lines):
+        for c, drawn in enumerate(row):
+            if not drawn:
+                strings.add((r, c, True))
+    for r, row in enumerate(board.v_lines):
+        for c, drawn in enumerate(row):
+            if not drawn:
+                strings.add((r, c, False))
+    return frozenset(strings)
+
+
+_cache = None
+_cache_dirty = False
+_cache_lock = threading.Lock()  # The GUI preloads the cache on a background thread
+
+
+def component_cache():
+    """
+    Return the memoized component values, loading them from CACHE_FILE on first use.
+    Canonical keys do not depend on the board size, so one table serves every grid.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                loaded = {}
+                if os.path.exists(CACHE_FILE):
+                    try:
+                        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+                            loaded = json.load(f)
+                    except Exception:
+                        loaded = {}
+                _cache = loaded
+    return _cache
+
+
+def save_cache():
+    global _cache_dirty
+    if not _cache_dirty:
+        return
+    try:
+        with open(CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(_cache, f)
+        _cache_dirty = False
+    except Exception:
+        pass
+
+
+class NimstringEvaluator:
+    def __init__(self, grid_size):
+        """
+        Nimber evaluator for one board size.
+        :param grid_size: Number of dots per side
+        """
+        self.grid_size = grid_size
+
+    # --- Graph helpers ---
+
+    def coins_of(self, string):
+        # Boxes tied by a string; a string with a single box is tied to the ground
+        r, c, is_h = string
+        n = self.grid_size
+        if is_h:
+            return [(rr, c) for rr in (r - 1, r) if 0 <= rr < n - 1]
+        return [(r, cc) for cc in (c - 1, c) if 0 <= cc < n - 1]
+
+    def strings_of(self, coin, state):
+        r, c = coin
+        return [s for s in ((r, c, True), (r + 1, c, True), (r, c, False), (r, c + 1, False)) if s in state]
+
+    def _other_end(self, string, coin):
+        ends = [other for other in self.coins_of(string) if other != coin]
+        return ends[0] if ends else None  # None = ground
+
+    def take_free_captures(self, state):
+        """
+        Capture every coin whose capture cannot change the value of the position.
+        :return: (state after captures, True if a capturable coin with a double-dealing choice remains)
+        """
+        while True:
+            degrees = {}
+            for s in state:
+                for coin in self.coins_of(s):
+                    degrees[coin] = degrees.get(coin, 0) + 1
+            capturable = [coin for coin, d in degrees.items() if d == 1]
+            if not capturable:
+                return state, False
+            free = None
+            for coin in capturable:
+                string = self.strings_of(coin, state)[0]
+                other = self._other_end(string, coin)
+                if other is None or degrees[other] != 2:
+                    free = string
+                    break
+                # A two-string coin leading straight on to another capturable coin is a fully opened chain
+                far = [s for s in self.strings_of(other, state) if s != string][0]
+                far_end = self._other_end(far, other)
+                if far_end is not None and degrees.get(far_end) == 1:
+                    free = string
+                    break
+            if free is None:
+                return state, True
+            state = state - {free}
+
+    def components(self, state):
+        parent = {}
+
+        def find(coin):
+            while parent.setdefault(coin, coin) != coin:
+                parent[coin] = parent[parent[coin]]
+                coin = parent[coin]
+            return coin
+
+        for s in state:
+            coins = self.coins_of(s)
+            root = find(coins[0])
+            for coin in coins[1:]:
+                parent[find(coin)] = root
+        groups = {}
+        for s in state:
+            groups.setdefault(find(self.coins_of(s)[0]), set()).add(s)
+        return [frozenset(group) for group in groups.values()]
+
+    def canonical_key(self, component):
+        # Doubled coordinates: boxes sit on odd/odd points, strings on the odd/even midpoints between them
+        points = []
+        coins = set()
+        for r, c, is_h in component:
+            points.append(("s", 2 * r, 2 * c + 1) if is_h else ("s", 2 * r + 1, 2 * c))
+            coins.update(self.coins_of((r, c, is_h)))
+        points.extend(("c", 2 * r + 1, 2 * c + 1) for r, c in coins)
+        best = None
+        for transform in _SYMMETRIES:
+            moved = [(kind,) + transform(y, x) for kind, y, x in points]
+            min_y = min(p[1] for p in moved)
+            min_x = min(p[2] for p in moved)
+            key = sorted((kind, y - min_y, x - min_x) for kind, y, x in moved)
+            if best is None or key < best:
+                best = key
+        return ";".join(f"{kind}{y},{x}" for kind, y, x in best)
+
+    # --- Values ---
+
+    def value(self, state):
+        """
+        Nimstring value of a position for the player to move.
+        :param state: frozenset of undrawn (r, c, is_h) strings
+        :return: Nimber (0 = loss for the player to move) or LOONY
+        """
+        state, loony = self.take_free_captures(state)
+        if loony:
+            return LOONY
+        total = 0
+        for component in self.components(state):
+            total ^= self.component_value(component)
+        return total
+
+    def component_value(self, component):
+        global _cache_dirty
+        cache = component_cache()
+        key = self.canonical_key(component)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        options = set()
+        for string in component:
+            option = self.value(component - {string})
+            if option != LOONY:
+                options.add(option)
+        nimber = 0
+        while nimber in options:
+            nimber += 1
+        cache[key] = nimber
+        _cache_dirty = True
+        return nimber
+
+    def winning_move(self, board, max_strings=MAX_COMPONENT_STRINGS):
+        """
+        Pick a move that leaves the opponent a Nimstring value of zero.
+        Moves that do not hand over a box are preferred.
+        :param board: DotsAndBoxesBoard (or any object with the same line/move helpers)
+        :param max_strings: Give up (return None) if any component has more strings than this
+        :return: (r, c, is_h) or None if there is no winning move or the position is too large
+        """
+        state = free_strings(board)
+        if not state:
+            return None
+        reduced, loony = self.take_free_captures(state)
+        if loony or reduced != state:
+            return None  # Capturable coins on the board: leave captures to the box-completing logic
+        if any(len(component) > max_strings for component in self.components(state)):
+            return None
+        winning = [move for move in state if self.value(state - {move}) == 0]
+        if not winning:
+            return None
+        safe = [move for move in winning if not board.move_makes_third_side(move)]
+        return random.choice(sorted(safe or winning))
+
+
+_evaluators = {}
+
+
+def evaluator_for(grid_size):
+    evaluator = _evaluators.get(grid_size)
+    if evaluator is None:
+        evaluator = _evaluators[grid_size] = NimstringEvaluator(grid_size)
+    return evaluator
@@ -0,0 +1,282 @@
+"""
+Retrograde-solved endgame tablebases and exact endgame search.
+
+The future of a Dots and Boxes position depends only on which lines are drawn,
+so a position is indexed by its line bitmask (bit i = i-th move in
+available_moves() order on an empty board). The tablebase stores, for every
+mask, the best score difference the player to move can still achieve. The mask
+itself is the (perfect) index, so a lookup is one byte read from a memory-mapped
+file. Tables are generated offline, layer by layer from the full board down to
+the empty one, on a process pool; every finished layer is checkpointed so an
+interrupted run resumes where it stopped.
+
+Full tables are practical up to grid_size 4 (3x3 boxes, 2^24 positions); a 4x4
+box board would need 2^40 entries. Larger boards instead solve the last
+ENDGAME_EDGES free lines exactly with a memoized search. The search memo is
+shared by every move of a session and dropped once it holds MAX_MEMO_ENTRIES
+positions (about 80 bytes each), so it stays at a few tens of MB in the game.
+
+Usage:
+    python tablebase.py --grid-size 4
+"""
+import os
+import sys
+import json
+import mmap
+import random
+import argparse
+from multiprocessing import Pool
+
+TABLEBASE_DIR = os.path.join(os.path.dirname(__file__), "tablebases")
+MAX_TABLEBASE_GRID = 4
+ENDGAME_EDGES = 14  # Free lines at or below which bigger boards are searched exactly
+MAX_MEMO_ENTRIES = 250_000  # ~20 MB; a single exact search over ENDGAME_EDGES lines needs at most 2^14
+
+
+def edge_list(grid_size):
+    # Same order as GameRules.available_moves() on an empty board
+    n = grid_size
+    return [(r, c, True) for r in range(n) for c in range(n - 1)] + [(r, c, False) for r in range(n - 1) for c in range(n)]
+
+
+def box_masks(grid_size):
+    """
+    For every edge index, the bitmasks of the other three sides of each box it borders.
+    A move completes one box per mask that is already fully drawn.
+    """
+    n = grid_size
+    index = {edge: i for i, edge in enumerate(edge_list(n))}
+    sides = {}
+    for r in range(n - 1):
+        for c in range(n - 1):
+            sides[(r, c)] = [index[(r, c, True)], index[(r + 1, c, True)], index[(r, c, False)], index[(r, c + 1, False)]]
+    result = []
+    for r, c, is_h in edge_list(n):
+        if is_h:
+            adjacent = [(rr, c) for rr in (r - 1, r) if 0 <= rr < n - 1]
+        else:
+            adjacent = [(r, cc) for cc in (c - 1, c) if 0 <= cc < n - 1]
+        me = index[(r, c, is_h)]
+        result.append([sum(1 << i for i in sides[box] if i != me) for box in adjacent])
+    return result
+
+
+def board_mask(state):
+    mask = 0
+    for i, (r, c, is_h) in enumerate(edge_list(state.grid_size)):
+        if (state.h_lines if is_h else state.v_lines)[r][c]:
+            mask |= 1 << i
+    return mask
+
+
+def edge_gain(mask, e, masks):
+    # Boxes completed by drawing free edge e on top of the drawn lines in `mask`
+    return sum(1 for other in masks[e] if mask & other == other)
+
+
+def move_values(mask, num_edges, masks, child_value):
+    """
+    Yield (edge index, boxes completed, value for the mover) for every free edge.
+    Completing a box keeps the turn, otherwise the opponent's value is negated.
+    """
+    free = ((1 << num_edges) - 1) & ~mask
+    while free:
+        bit = free & -free
+        free ^= bit
+        e = bit.bit_length() - 1
+        gain = edge_gain(mask, e, masks)
+        yield e, gain, gain + child_value(mask | bit) if gain else -child_value(mask | bit)
+
+
+def _best_moves(mask, num_edges, masks, child_value):
+    best = None
+    best_edges = []
+    for e, _, value in move_values(mask, num_edges, masks, child_value):
+        if best is None or value > best:
+            best, best_edges = value, [e]
+        elif value == best:
+            best_edges.append(e)
+    return best, best_edges
+
+
+class Tablebase:
+    def __init__(self, grid_size, directory=TABLEBASE_DIR):
+        """
+        Read-only view of a generated tablebase file (memory-mapped on first lookup).
+        :param grid_size: Number of dots per side (at most MAX_TABLEBASE_GRID)
+        """
+        self.grid_size = grid_size
+        self.path = os.path.join(directory, f"tablebase_{grid_size}.bin")
+        self.checkpoint_path = os.path.join(directory, f"tablebase_{grid_size}.json")
+        self.num_edges = 2 * grid_size * (grid_size - 1)
+        self.masks = box_masks(grid_size)
+        self._mmap = None
+
+    @property
+    def complete(self):
+        if not os.path.exists(self.checkpoint_path):
+            return False
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("next_layer") == -1
+
+    def value(self, mask):
+        """
+        Best achievable (own boxes - opponent boxes) from here for the player to move.
+        """
+        if self._mmap is None:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        v = self._mmap[mask]
+        return v - 256 if v > 127 else v
+
+    def best_move(self, state):
+        _, edges = _best_moves(board_mask(state), self.num_edges, self.masks, self.value)
+        return edge_list(self.grid_size)[random.choice(edges)] if edges else None
+
+
+class EndgameSolver:
+    def __init__(self, grid_size):
+        """
+        Exact memoized negamax over the remaining free lines, for any board size.
+        """
+        self.grid_size = grid_size
+        self.num_edges = 2 * grid_size * (grid_size - 1)
+        self.masks = box_masks(grid_size)
+        self.full = (1 << self.num_edges) - 1
+        self.memo = {self.full: 0}
+        self._bit_masks = {1 << e: masks for e, masks in enumerate(self.masks)}
+
+    def value(self, mask):
+        # Same scoring as move_values(), inlined: this is the solver's hot loop
+        memo = self.memo
+        cached = memo.get(mask)
+        if cached is not None:
+            return cached
+        best = None
+        free = self.full & ~mask
+        while free:
+            bit = free & -free
+            free ^= bit
+            gain = 0
+            for other in self._bit_masks[bit]:
+                if mask & other == other:
+                    gain += 1
+            child = memo.get(mask | bit)
+            if child is None:
+                child = self.value(mask | bit)
+            value = gain + child if gain else -child
+            if best is None or value > best:
+                best = value
+        memo[mask] = best
+        return best
+
+    def best_move(self, state):
+        _, edges = _best_moves(board_mask(state), self.num_edges, self.masks, self.value)
+        return edge_list(self.grid_size)[random.choice(edges)] if edges else None
+
+
+_tablebases = {}
+_solvers = {}
+
+
+def endgame_solver(grid_size):
+    # One memo per grid size and process, kept bounded across long sessions
+    solver = _solvers.get(grid_size)
+    if solver is None or len(solver.memo) > MAX_MEMO_ENTRIES:
+        solver = _solvers[grid_size] = EndgameSolver(grid_size)
+    return solver
+
+
+def perfect_move(state, endgame_edges=ENDGAME_EDGES, solver=None):
+    """
+    Optimal move from a complete tablebase, or from exact search once few lines remain.
+    :param solver: EndgameSolver for the exact search (default: the shared endgame_solver)
+    :return: (r, c, is_h) or None if the position is neither covered nor small enough
+    """
+    n = state.grid_size
+    if n <= MAX_TABLEBASE_GRID:
+        if n not in _tablebases:
+            tablebase = Tablebase(n)
+            _tablebases[n] = tablebase if tablebase.complete else None
+        if _tablebases[n] is not None:
+            return _tablebases[n].best_move(state)
+    if len(state.available_moves()) > endgame_edges:
+        return None
+    return (solver or endgame_solver(n)).best_move(state)
+
+
+# --- Generation (needs NumPy) ---
+
+def _solve_chunk(task):
+    import numpy as np
+    path, grid_size, chunk = task
+    num_edges = 2 * grid_size * (grid_size - 1)
+    masks = box_masks(grid_size)
+    table = np.memmap(path, dtype=np.int8, mode="r+", shape=(1 << num_edges,))
+    best = np.full(len(chunk), -128, dtype=np.int16)
+    for e in range(num_edges):
+        bit = 1 << e
+        free = (chunk & bit) == 0
+        if not free.any():
+            continue
+        parent = chunk[free]
+        gain = np.zeros(len(parent), dtype=np.int16)
+        for other in masks[e]:
+            gain += (parent & other) == other
+        child = table[parent | bit].astype(np.int16)
+        best[free] = np.maximum(best[free], np.where(gain > 0, gain + child, -child))
+    table[chunk] = best.astype(np.int8)
+    table.flush()
+    return len(chunk)
+
+
+def generate(grid_size, directory=TABLEBASE_DIR, workers=None, chunk_size=1 << 20):
+    """
+    Build (or resume building) the tablebase for grid_size.
+    """
+    import numpy as np
+    if grid_size > MAX_TABLEBASE_GRID:
+        raise ValueError(f"Full tablebases are limited to grid_size {MAX_TABLEBASE_GRID}; "
+                         f"larger boards use the last {ENDGAME_EDGES} free lines exactly.")
+    os.makedirs(directory, exist_ok=True)
+    tablebase = Tablebase(grid_size, directory)
+    num_edges = tablebase.num_edges
+    size = 1 << num_edges
+    checkpoint = {"grid_size": grid_size, "next_layer": num_edges}
+    if os.path.exists(tablebase.checkpoint_path) and os.path.exists(tablebase.path):
+        with open(tablebase.checkpoint_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    else:
+        with open(tablebase.path, "wb") as f:
+            f.truncate(size)  # All zeros; the full board (last layer) is 0 by definition
+        checkpoint["next_layer"] = num_edges - 1
+    indices = np.arange(size, dtype=np.int64)
+    popcount = np.zeros(size, dtype=np.uint8)
+    for e in range(num_edges):
+        popcount += ((indices >> e) & 1).astype(np.uint8)
+    with Pool(workers) as pool:
+        for layer in range(checkpoint["next_layer"], -1, -1):
+            layer_masks = indices[popcount == layer]
+            chunks = [layer_masks[i:i + chunk_size] for i in range(0, len(layer_masks), chunk_size)]
+            pool.map(_solve_chunk, [(tablebase.path, grid_size, chunk) for chunk in chunks])
+            checkpoint["next_layer"] = layer - 1
+            with open(tablebase.checkpoint_path, "w", encoding="utf-8") as f:
+                json.dump(checkpoint, f)
+            print(f"Layer {layer} ({len(layer_masks)} positions) solved", file=sys.stderr)
+    return tablebase
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a Dots and Boxes endgame tablebase.")
+    parser.add_argument("--grid-size", type=int, default=4, help=f"Number of dots per side (3-{MAX_TABLEBASE_GRID})")
+    parser.add_argument("--out", default=TABLEBASE_DIR, help="Output directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+    if not 3 <= args.grid_size <= MAX_TABLEBASE_GRID:
+        parser.error(f"--grid-size must be between 3 and {MAX_TABLEBASE_GRID}")
+    tablebase = generate(args.grid_size, args.out, args.workers)
+    print(f"Empty board value for the first player: {tablebase.value(0):+d}")
+
+
+if __name__ == "__main__":
+    main()
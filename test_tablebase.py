@@ -0,0 +1,79 @@
+"""
+Exact endgame search checked against a brute-force minimax over BoardState.
+
+Run with: python -m unittest test_tablebase
+"""
+import random
+import unittest
+
+from board_state import BoardState
+from tablebase import EndgameSolver, board_mask, perfect_move
+
+FREE_LINES = 7  # Brute force visits up to 7! move orders per position
+
+
+def naive_value(state):
+    # Best (own boxes - opponent boxes) still achievable by the player to move, no memo, no pruning
+    moves = state.available_moves()
+    if not moves:
+        return 0
+    best = None
+    for move in moves:
+        value = naive_move_value(state, move)
+        if best is None or value > best:
+            best = value
+    return best
+
+
+def naive_move_value(state, move):
+    child = state.copy_state()
+    player = child.current_player
+    child.make_move(*move)
+    before = child.scores[player]
+    if child.check_and_update_boxes():
+        return child.scores[player] - before + naive_value(child)
+    child.current_player = 1 - player
+    return -naive_value(child)
+
+
+def random_position(grid_size, free_lines, rng):
+    state = BoardState(grid_size)
+    moves = state.available_moves()
+    rng.shuffle(moves)
+    for move in moves[:len(moves) - free_lines]:
+        state.make_move(*move)
+        if not state.check_and_update_boxes():
+            state.current_player = 1 - state.current_player
+    return state
+
+
+class EndgameSolverTest(unittest.TestCase):
+    def test_value_matches_brute_force(self):
+        rng = random.Random(3)
+        for grid_size in (3, 4):
+            solver = EndgameSolver(grid_size)
+            for _ in range(15):
+                state = random_position(grid_size, FREE_LINES, rng)
+                self.assertEqual(solver.value(board_mask(state)), naive_value(state))
+
+    def test_last_lines_of_small_board(self):
+        # 2x2-box positions with 0-4 free lines, including finished boards
+        solver = EndgameSolver(3)
+        rng = random.Random(5)
+        for free_lines in range(5):
+            for _ in range(20):
+                state = random_position(3, free_lines, rng)
+                self.assertEqual(solver.value(board_mask(state)), naive_value(state))
+
+    def test_perfect_move_is_optimal(self):
+        rng = random.Random(7)
+        for grid_size in (3, 5):
+            for _ in range(10):
+                state = random_position(grid_size, FREE_LINES, rng)
+                move = perfect_move(state)
+                self.assertIsNotNone(move)
+                self.assertEqual(naive_move_value(state, move), naive_value(state))
+
+
+if __name__ == "__main__":
+    unittest.main()